@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+#
+# Benchmarks for the loaders of the archive indices
+
+import argparse
+import gc
+import gzip
+import lzma
+import os
+import tempfile
+import time
+
+import apt_pkg
+import debian.deb822 as d822
+import multiprocess as mp
+
+import common
+import pkgindex
+
+
+def best_of(runs, func, *args, **kwargs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def read_index(path):
+    # the whole uncompressed content of an index, whatever its compression
+    if path.endswith(tuple(ext for ext in common.INDEX_EXTENSIONS if ext)):
+        return b''.join(common.ThreadedDecompressor(path))
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def bench_sources(args):
+    # parse the Sources indices uncompressed and in all the supported compressions
+    compressors = {
+        '': lambda data: data,
+        '.xz': lzma.compress,
+        '.gz': gzip.compress,
+    }
+    if common.zstandard is not None:
+        compressors['.zst'] = common.zstandard.ZstdCompressor().compress
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        print(f"Preparing {args.distro} Sources indices in {', '.join(ext or 'uncompressed' for ext in compressors)} format...")
+        size = 0
+        for component in common.COMPONENTS:
+            data = read_index(common.find_index(args.distro, component, lists_dir=args.lists_dir))
+            size += len(data)
+            for ext, compress in compressors.items():
+                os.makedirs(os.path.join(tmpdir, ext or 'plain'), exist_ok=True)
+                with open(os.path.join(tmpdir, ext or 'plain', f"bench_dists_{args.distro}_{component}_source_Sources{ext}"), 'wb') as f:
+                    f.write(compress(data))
+
+        print(f"Parsing {size / 2**20:.1f} MiB of Sources indices (best of {args.runs} runs):")
+        baseline = None
+        for ext in compressors:
+            elapsed = best_of(args.runs, common.parse_source_pkgs, args.distro, lists_dir=os.path.join(tmpdir, ext or 'plain'))
+            baseline = baseline or elapsed
+            print(f"  {ext or 'uncompressed':<13} {elapsed:7.2f}s  {size / 2**20 / elapsed:7.1f} MiB/s  {elapsed / baseline:5.2f}x")
+
+
+def bench_packages(args):
+    # startup time of the apt cache of the host vs the index of the Packages files
+    print(f"Loading binary packages data (best of {args.runs} runs):")
+    elapsed_apt = best_of(args.runs, apt_pkg.Cache, None)
+    print(f"  {'apt_pkg.Cache':<25} {elapsed_apt:7.2f}s  ({len(apt_pkg.Cache(None).packages)} packages)")
+    elapsed_index = best_of(args.runs, pkgindex.PackagesIndex.load, args.suites, args.archs, lists_dir=args.lists_dir)
+    index = pkgindex.PackagesIndex.load(args.suites, args.archs, lists_dir=args.lists_dir)
+    print(f"  {'pkgindex.PackagesIndex':<25} {elapsed_index:7.2f}s  ({len(index)} packages, {' '.join(args.suites)}, {' '.join(args.archs)})  {elapsed_index / elapsed_apt:5.2f}x")
+
+
+def resident_size():
+    # current resident set size of this process, in bytes
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def legacy_sources(distro, lists_dir):
+    # the sources table as parse_source_pkgs used to build it: 9-tuples of the raw fields
+    sources = dict()
+    for component in common.COMPONENTS:
+        for x in d822.Sources.iter_paragraphs(common.open_index(common.find_index(distro, component, lists_dir=lists_dir))):
+            if x['Package'] not in sources or apt_pkg.version_compare(x['Version'], sources[x['Package']][0]) > 0:
+                sources[x['Package']] = (x['Version'], x['Binary'], x.get('Build-Depends', ''), x.get('Build-Depends-Indep', ''), x.get('Build-Depends-Arch', ''), x.get('Testsuite-Triggers', ''), x['Maintainer'], x.get('Uploaders', ''), x['Section'])
+    return sources
+
+
+def record_sources(distro, lists_dir):
+    return common.parse_source_pkgs(distro, lists_dir=lists_dir)[-1]
+
+
+def tables_size(loader, lists_dir):
+    # resident size of the unstable + testing sources tables; run in a fresh process for every loader
+    gc.collect()
+    before = resident_size()
+    tables = [loader(distro, lists_dir) for distro in ('unstable', 'testing')]
+    gc.collect()
+    return resident_size() - before, sum(len(table) for table in tables)
+
+
+def bench_memory(args):
+    print('Resident size of the unstable + testing sources tables:')
+    for name, loader in (('raw strings 9-tuples', legacy_sources), ('sourcerecord', record_sources)):
+        with mp.Pool(1) as p:
+            size, entries = p.apply(tables_size, (loader, args.lists_dir))
+        print(f"  {name:<22} {size / 2**20:8.1f} MiB  ({entries} entries)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', default=3, type=int, help='how many times to repeat each measure, default 3')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    sources_parser = subparsers.add_parser('sources', help='parsing of uncompressed vs compressed Sources indices')
+    sources_parser.add_argument('--distro', default='unstable', help='distribution to use, default unstable')
+    sources_parser.add_argument('--lists-dir', default=common.APT_LISTS_DIR, help=f'directory with the Sources indices, default {common.APT_LISTS_DIR}')
+    sources_parser.set_defaults(func=bench_sources)
+
+    packages_parser = subparsers.add_parser('packages', help='startup time of the apt cache vs the Packages indices loader')
+    packages_parser.add_argument('--suites', default=['unstable'], nargs='+', help='suites to load, default unstable')
+    packages_parser.add_argument('--archs', default=['amd64'], nargs='+', help='architectures to load, default amd64')
+    packages_parser.add_argument('--lists-dir', default=common.APT_LISTS_DIR, help=f'directory with the Packages indices, default {common.APT_LISTS_DIR}')
+    packages_parser.set_defaults(func=bench_packages)
+
+    memory_parser = subparsers.add_parser('memory', help='resident size of the sources tables, before and after the sourcerecord conversion')
+    memory_parser.add_argument('--lists-dir', default=common.APT_LISTS_DIR, help=f'directory with the Sources indices, default {common.APT_LISTS_DIR}')
+    memory_parser.set_defaults(func=bench_memory)
+
+    args = parser.parse_args()
+
+    apt_pkg.init_config()
+    apt_pkg.init_system()
+    args.func(args)
@@ -1,44 +1,159 @@
 import debian.deb822 as d822
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 import apt_pkg
+import glob
+import lzma
+import os.path
+import queue
+import sys
+import threading
+import zlib
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
+APT_LISTS_DIR = '/var/lib/apt/lists'
+# the indices can be stored compressed (f.e. with Acquire::GzipIndexes), in order of preference
+INDEX_EXTENSIONS = ['', '.xz', '.gz', '.zst']
+# archive components we look at
+COMPONENTS = ['main', 'contrib', 'non-free', ]
+# how much compressed data to read at a time
+CHUNK_SIZE = 1 << 20
 
-def parse_source_pkgs(distro='unstable'):
+# a Sources entry: the Binary and relationships fields are parsed (once) in tuples of package names,
+# and the strings repeated across entries (package names, maintainers, sections) are interned
+sourcerecord = namedtuple('sourcerecord', ['version', 'binaries', 'build_depends', 'build_depends_indep', 'build_depends_arch', 'testsuite_triggers', 'maintainer', 'uploaders', 'section'])
+
+
+def find_index(distro, component, index=('source', 'Sources'), lists_dir=APT_LISTS_DIR):
+    # apt lists are named `<mirror hostname and path>_dists_<distro>_<component>_<index>`, for any mirror,
+    # and there can be a mirror/snapshot layout `dists/<distro>/<component>/<index>`: among all of them,
+    # compressed or not, take the most recently updated one (for the same time, in order of preference)
+    found = []
+    for ext in INDEX_EXTENSIONS:
+        # the .zst lists can't be read without zstandard, dont let them hide the ones which can
+        if ext == '.zst' and zstandard is None:
+            continue
+        found.extend(glob.glob(os.path.join(glob.escape(lists_dir), f"*_dists_{distro}_{component}_{'_'.join(index)}{ext}")))
+        path = os.path.join(lists_dir, 'dists', distro, component, *index) + ext
+        if os.path.isfile(path):
+            found.append(path)
+    if not found:
+        raise FileNotFoundError(f"no {'/'.join(index)} index found for {distro}/{component} in {lists_dir}")
+    # max() keeps the first of the equally recent ones
+    return max(found, key=os.path.getmtime)
+
+
+class ThreadedDecompressor:
+    # iterate over the lines of a compressed index: the file is decompressed chunk by chunk in a
+    # separate thread (lzma, zlib and zstandard release the GIL) while the caller parses the previous ones
+
+    def __init__(self, path, queue_size=8):
+        if path.endswith('.xz'):
+            self._new_decompressor = lzma.LZMADecompressor
+        elif path.endswith('.gz'):
+            self._new_decompressor = lambda: zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+        elif path.endswith('.zst'):
+            if zstandard is None:
+                raise RuntimeError(f"python3-zstandard is needed to read {path}")
+            self._new_decompressor = lambda: zstandard.ZstdDecompressor().decompressobj()
+        else:
+            raise ValueError(f"unsupported compression for {path}")
+        self.path = path
+        self._chunks = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._decompress, daemon=True)
+        self._thread.start()
+
+    def _decompress(self):
+        try:
+            decompressor = None
+            with open(self.path, 'rb') as f:
+                while True:
+                    data = f.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    # a file can be made of several concatenated streams (gzip members, zstd frames):
+                    # what follows the end of one is the start of the next
+                    while data:
+                        if decompressor is None:
+                            decompressor = self._new_decompressor()
+                        chunk = decompressor.decompress(data)
+                        if chunk:
+                            self._chunks.put(chunk)
+                        data = b''
+                        if decompressor.eof:
+                            data = decompressor.unused_data
+                            decompressor = None
+            if decompressor is not None:
+                raise EOFError(f"{self.path} is truncated")
+            self._chunks.put(None)
+        except Exception as e:
+            self._chunks.put(e)
+
+    def __iter__(self):
+        rest = b''
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            lines = (rest + chunk).splitlines(keepends=True)
+            rest = lines.pop() if not lines[-1].endswith(b'\n') else b''
+            yield from lines
+        if rest:
+            yield rest
+
+
+def open_index(path):
+    # uncompressed indices are passed as real files, so deb822 can parse them with apt_pkg
+    if path.endswith(tuple(ext for ext in INDEX_EXTENSIONS if ext)):
+        return ThreadedDecompressor(path)
+    return open(path)
+
+
+def parse_names(value):
+    # 'a (>= 1) [amd64] | b,\n c' -> ('a', 'c'), ie the first package name of every relationship
+    return tuple(sys.intern(rel.split()[0]) for rel in value.split(',') if rel.strip())
+
+
+def source_record(x):
+    return sourcerecord(x['Version'], parse_names(x['Binary']), parse_names(x.get('Build-Depends', '')), parse_names(x.get('Build-Depends-Indep', '')), parse_names(x.get('Build-Depends-Arch', '')), parse_names(x.get('Testsuite-Triggers', '')), sys.intern(x['Maintainer']), sys.intern(x.get('Uploaders', '')), sys.intern(x['Section']))
+
+
+def parse_source_pkgs(distro='unstable', lists_dir=APT_LISTS_DIR):
     # HACK! get the latest binary packags for every source pkg
     # if there are cruft binary packgaes they dont get removed automatically
     # so parse the source entries, and just keep the ones with the highest version
     # (ie the latest uploaded); dont care much about proper version comparison
     sources = dict()
-    for suite in ['main', 'contrib', 'non-free', ]:
-        for x in d822.Sources.iter_paragraphs(open(f"/var/lib/apt/lists/ftp.debian.org_debian_dists_{distro}_{suite}_source_Sources")):
+    for suite in COMPONENTS:
+        for x in d822.Sources.iter_paragraphs(open_index(find_index(distro, suite, lists_dir=lists_dir))):
             if x['Package'] not in sources:
-                sources[x['Package']] = (x['Version'], x['Binary'], x.get('Build-Depends', ''), x.get('Build-Depends-Indep', ''), x.get('Build-Depends-Arch', ''), x.get('Testsuite-Triggers', ''), x['Maintainer'], x.get('Uploaders', ''), x['Section'])
+                sources[sys.intern(x['Package'])] = source_record(x)
             else:
-                v = sources[x['Package']][0]
+                v = sources[x['Package']].version
                 if apt_pkg.version_compare(x['Version'], v) > 0:
-                    sources[x['Package']] = (x['Version'], x['Binary'], x.get('Build-Depends', ''), x.get('Build-Depends-Indep', ''), x.get('Build-Depends-Arch', ''), x.get('Testsuite-Triggers', ''), x['Maintainer'], x.get('Uploaders', ''), x['Section'])
+                    sources[x['Package']] = source_record(x)
 
     latestbinpkgs = set()
     for k in sources.keys():
-        latestbinpkgs.update(set(sources[k][1].split(', ')))
+        latestbinpkgs.update(sources[k].binaries)
 
     rbdeps = defaultdict(list)
     rbdepsi = defaultdict(list)
     rbdepsa = defaultdict(list)
     rtstrig = defaultdict(list)
     for src in sources.keys():
-        for bd in sources[src][2].split(', '):
-            if bd:
-                rbdeps[bd.split()[0]].append(src)
-        for bdi in sources[src][3].split(', '):
-            if bdi:
-                rbdepsi[bdi.split()[0]].append(src)
-        for bda in sources[src][4].split(', '):
-            if bda:
-                rbdepsa[bda.split()[0]].append(src)
-        for tstrig in sources[src][5].split(', '):
-            if tstrig:
-                rtstrig[tstrig.split()[0]].append(src)
+        for bd in sources[src].build_depends:
+            rbdeps[bd].append(src)
+        for bdi in sources[src].build_depends_indep:
+            rbdepsi[bdi].append(src)
+        for bda in sources[src].build_depends_arch:
+            rbdepsa[bda].append(src)
+        for tstrig in sources[src].testsuite_triggers:
+            rtstrig[tstrig].append(src)
 
     return latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, sources
 
@@ -49,3 +164,49 @@ def is_python2_dep(dep):
                      or dep.startswith(('python3', 'ipython3', 'libboost-python', 'libpython3', 'python-gi-dev', 'cython3', 'python-pip-whl', 'python-odf-tools', 'pythonpy', 'python-clang-9', 'python-dbus-dev', 'python-greenlet-dev'))):
         return dep
     return False
+
+
+def strongly_connected_components(graph):
+    # iterative Tarjan's algorithm (bugs chains are too deep for the recursive version);
+    # graph is a dict {node: iterable of successors}, returns a list of components (lists of nodes)
+    index = {}
+    lowlink = {}
+    stack = []
+    onstack = set()
+    components = []
+    counter = 0
+    for root in list(graph):
+        if root in index:
+            continue
+        work = [(root, iter(graph.get(root, ())))]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        onstack.add(root)
+        while work:
+            node, succs = work[-1]
+            for succ in succs:
+                if succ not in index:
+                    index[succ] = lowlink[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    onstack.add(succ)
+                    work.append((succ, iter(graph.get(succ, ()))))
+                    break
+                elif succ in onstack:
+                    lowlink[node] = min(lowlink[node], index[succ])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        onstack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
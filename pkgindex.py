@@ -0,0 +1,133 @@
+# A compact reverse-dependencies index, built streaming the Packages files of the chosen suites and
+# architectures; it can be used in place of apt_pkg.Cache, implementing the (small) part of its API
+# used by rdeps.py and py2rm_progress.py: `in`, [], version_list, section, depends_list, rev_depends_list
+
+import sys
+from collections import defaultdict
+
+import apt_pkg
+import debian.deb822 as d822
+import multiprocess as mp
+
+import common
+
+# binary packages relationships to index, mapped to the apt_pkg dependency type names
+RELATIONS = {
+    'Pre-Depends': 'PreDepends',
+    'Depends': 'Depends',
+    'Recommends': 'Recommends',
+    'Suggests': 'Suggests',
+}
+
+
+def parse_relation(value):
+    # 'a (>= 1) | b:any, c' -> (('a', 'b'), ('c', )), only the names of the alternatives of every dependency
+    return tuple(tuple(sys.intern(alt.split()[0].split(':')[0]) for alt in dep.split('|'))
+                 for dep in value.replace('\n', ' ').split(',') if dep.strip())
+
+
+def parse_packages(path):
+    # runs in a worker process: only return plain tuples, (name, version, section, deps) for every package
+    # with deps a tuple of (apt dependency type, alternatives)
+    packages = []
+    for x in d822.Packages.iter_paragraphs(common.open_index(path), fields=['Package', 'Version', 'Section', *RELATIONS]):
+        deps = tuple((dep_type, alternatives) for field, dep_type in RELATIONS.items() for alternatives in parse_relation(x.get(field, '')))
+        packages.append((x['Package'], x['Version'], x.get('Section', ''), deps))
+    return packages
+
+
+class PackagesIndex:
+
+    def __init__(self, packages):
+        # packages is {name: (section, deps)}
+        self._packages = packages
+        rdepends = defaultdict(list)
+        for name, (_, deps) in packages.items():
+            for dep_type, alternatives in deps:
+                for target in alternatives:
+                    rdepends[target].append((name, dep_type))
+        self._rdepends = {target: tuple(rdeps) for target, rdeps in rdepends.items()}
+
+    @classmethod
+    def load(cls, suites, archs, lists_dir=common.APT_LISTS_DIR, components=common.COMPONENTS):
+        # stream all the Packages files in parallel; when a package is in more than a suite or
+        # architecture, keep its highest version (or the first one found for the same version);
+        # call it when no other thread is at work, its locks could be left held in the forked workers
+        paths = [common.find_index(suite, component, index=(f"binary-{arch}", 'Packages'), lists_dir=lists_dir)
+                 for suite in suites for component in components for arch in archs]
+        with mp.get_context('fork').Pool(min(len(paths), mp.cpu_count())) as p:
+            results = p.map(parse_packages, paths)
+        versions = {}
+        packages = {}
+        for result in results:
+            for name, version, section, deps in result:
+                if name not in versions or apt_pkg.version_compare(version, versions[name]) > 0:
+                    name = sys.intern(name)
+                    versions[name] = version
+                    packages[name] = (sys.intern(section), deps)
+        return cls(packages)
+
+    def __contains__(self, name):
+        # like apt, also the (virtual) packages only known as the target of some dependency
+        return name in self._packages or name in self._rdepends
+
+    def __getitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        return Package(self, name)
+
+    def __len__(self):
+        return len(self._packages.keys() | self._rdepends.keys())
+
+
+class Package:
+    __slots__ = ('_index', 'name')
+
+    def __init__(self, index, name):
+        self._index = index
+        self.name = name
+
+    @property
+    def version_list(self):
+        # purely virtual packages have no versions
+        if self.name not in self._index._packages:
+            return []
+        return [Version(self)]
+
+    @property
+    def rev_depends_list(self):
+        return [Dependency(Package(self._index, parent), dep_type, self)
+                for parent, dep_type in self._index._rdepends.get(self.name, ())]
+
+
+class Version:
+    __slots__ = ('parent_pkg', )
+
+    def __init__(self, parent_pkg):
+        self.parent_pkg = parent_pkg
+
+    @property
+    def section(self):
+        return self.parent_pkg._index._packages[self.parent_pkg.name][0]
+
+    @property
+    def depends_list(self):
+        # {dependency type: list of or-groups, each a list of Dependency}
+        index = self.parent_pkg._index
+        depends = defaultdict(list)
+        for dep_type, alternatives in index._packages[self.parent_pkg.name][1]:
+            depends[dep_type].append([Dependency(self.parent_pkg, dep_type, Package(index, target)) for target in alternatives])
+        return dict(depends)
+
+
+class Dependency:
+    __slots__ = ('parent_pkg', 'dep_type', 'target_pkg')
+
+    def __init__(self, parent_pkg, dep_type, target_pkg):
+        self.parent_pkg = parent_pkg
+        self.dep_type = dep_type
+        self.target_pkg = target_pkg
+
+    @property
+    def parent_ver(self):
+        return Version(self.parent_pkg)
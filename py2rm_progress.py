@@ -13,12 +13,20 @@ from matplotlib import pyplot as plt
 import matplotlib.dates as mdates
 from collections import defaultdict, Counter, namedtuple
 import multiprocess as mp
+from multiprocess.pool import ThreadPool
 import subprocess
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 import lxml.html
 import requests
+import pickle
+import sqlite3
+import hashlib
+import json
+import queue
+import time
+import functools
 
 # support both "TAG: pkg -- description" and "TAG: pkg"
 WNPPRE = regex.compile(r'(?P<tag>[^:]+): (?P<src>[^ ]+)(?:$| -- .*)')
@@ -30,25 +38,333 @@ EXTRALEVEL = 2
 # namedtuple to hold the data we care for py2removal
 dataitem = namedtuple('dataitem', ['bugno', 'pkg', 'edges_1', 'graph_1', 'maint', 'uplds', 'fdeps', 'popcon', 'wnppp', 'edges_N', 'graph_N', 'py3k_pkgs_avail', 'real_rdeps', 'blocked_bugs', 'in_testing'])
 
+# the history of the py2removal bugs, one snapshot per run, to draw the progress chart and the leaderboard
+HISTORY_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS snapshots (taken TEXT PRIMARY KEY, open INTEGER, done INTEGER, pending INTEGER, backfilled INTEGER DEFAULT 0);
+CREATE TABLE IF NOT EXISTS snapshot_severities (taken TEXT, severity TEXT, count INTEGER, PRIMARY KEY (taken, severity));
+CREATE TABLE IF NOT EXISTS closed (bugno INTEGER PRIMARY KEY, done_by TEXT, closed TEXT);
+'''
+
+# the command line options the results of the stages depend on
+ARTIFACT_OPTIONS = ['bugs', 'limit', 'lists_dir', 'packages_suites', 'packages_archs', 'no_pypi']
+# the shared stages depending on the configuration of all the campaigns (their bugs, if any is about python)
+CAMPAIGNS_ARTIFACTS = ['fetch-bugs', 'popcon', 'pypi-index']
+
+# a step of the script: it gets the results of the `requires` stages, and runs on a 'thread' (network
+# bound, or needing the apt cache of the main process), on a 'process' (CPU bound) or in the 'main'
+# thread, alone (forking its own processes: see run_stages()); the stages
+# without `checkpoint` (their results can't be stored) are always run, when needed, and the ones
+# listed in `after` only delay it, when they are part of the run, without passing their results
+stage = namedtuple('stage', ['name', 'func', 'requires', 'kind', 'checkpoint', 'after'], defaults=[True, ()])
+
+# a transition tracked by the script: the usertags (by `user`) of its bugs and of the ones to keep, the name of
+# the function in common.py telling if a dependency is part of the transition, where to store its outputs, and
+# its thresholds: the level of the additional graphs, the size of the leaderboard, the start of the history
+# and the most real rdeps a package can have to raise its bug to RC (None to never change severities); `python`
+# campaigns also look for their packages on PyPI and for their python3- counterparts, and `no_graphs` are the packages
+# (f.e. the interpreter) with too big graphs to render
+campaign = namedtuple('campaign', ['name', 'user', 'usertag', 'keep_usertag', 'predicate', 'destdir', 'history_db', 'extralevel',
+                                   'leaderboard_top', 'progress_since', 'rc_real_rdeps', 'blocks_preamble', 'severity_preamble',
+                                   'python', 'no_graphs'])
+
+CAMPAIGN_DEFAULTS = {
+    'keep_usertag': None,
+    'history_db': None,
+    'extralevel': EXTRALEVEL,
+    'leaderboard_top': 20,
+    'progress_since': None,
+    'rc_real_rdeps': None,
+    'blocks_preamble': [],
+    'severity_preamble': [],
+    'python': False,
+    'no_graphs': [],
+}
+
+# the campaign tracked when no --campaigns file is given
+PY2REMOVAL = {
+    'name': 'py2removal',
+    'user': 'debian-python@lists.debian.org',
+    'usertag': 'py2removal',
+    'keep_usertag': 'py2keep',
+    'predicate': 'is_python2_dep',
+    # there are very old bugs (Jan 2018) tagged `py2removal`; they are just a handful, so let's ignore them
+    'progress_since': '2019-07-01',
+    'rc_real_rdeps': 0,
+    'python': True,
+    'no_graphs': ['python'],
+    'blocks_preamble': ['# This is an automated script, part of the effort for the removal of Python 2 from bullseye',
+                        '#  * https://wiki.debian.org/Python/2Removal',
+                        '#  * http://sandrotosi.me/debian/py2removal/index.html',
+                        ],
+    'severity_preamble': ['# This is an automated script, part of the effort for the removal of Python 2 from bullseye',
+                          '#  * https://wiki.debian.org/Python/2Removal',
+                          '#  * http://sandrotosi.me/debian/py2removal/index.html',
+                          '# See https://lists.debian.org/debian-devel-announce/2019/11/msg00000.html',
+                          '# and https://lists.debian.org/debian-python/2019/12/msg00076.html',
+                          '# and https://lists.debian.org/debian-python/2020/03/msg00087.html',
+                          '# mail threads for more details on this severity update',
+                          ],
+}
+
 
 def log(msg):
     print(f"{datetime.datetime.now()}    {msg}")
 
 
-if __name__ == '__main__':
+def artifact_path(cache_dir, stage):
+    return os.path.join(cache_dir, f"{stage}.pickle")
+
+
+def artifact_options(args, stage):
+    # the options changing the results of the stage: the artifacts of a run can only be reused by a run with the same
+    # ones; the stages of a campaign also depend on its configuration, some of the shared ones on all the campaigns
+    options = {option: getattr(args, option) for option in ARTIFACT_OPTIONS}
+    campaign_name = stage.rpartition(':')[0]
+    if campaign_name:
+        options['campaigns'] = [c._asdict() for c in args.campaign_list if c.name == campaign_name]
+    elif stage in CAMPAIGNS_ARTIFACTS:
+        options['campaigns'] = [c._asdict() for c in args.campaign_list]
+    return options
+
+
+def save_artifact(args, stage, results):
+    # write to a temp file first, so a crash while saving doesnt leave a truncated artifact around
+    path = artifact_path(args.cache_dir, stage)
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump({'options': artifact_options(args, stage), 'results': results}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+
+
+def previous_artifact(args, stage):
+    # the results of a stage in the previous run, if any and with the same options, to compare the current ones with
+    path = artifact_path(args.cache_dir, stage)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, 'rb') as f:
+        artifact = pickle.load(f)
+    if artifact.get('options') != artifact_options(args, stage):
+        log(f"Ignoring the previous results of stage `{stage}`, produced with different options")
+        return {}
+    return artifact['results']
+
+
+def load_artifact(args, stage):
+    path = artifact_path(args.cache_dir, stage)
+    if not os.path.isfile(path):
+        raise SystemExit(f"ERROR: no cached artifact for stage `{stage}` ({path}), run it first")
+    with open(path, 'rb') as f:
+        artifact = pickle.load(f)
+    # the artifacts of the older versions dont have any options
+    stored, options = artifact.get('options') or {}, artifact_options(args, stage)
+    if stored != options:
+        differences = ', '.join('a different campaigns configuration' if option == 'campaigns' else
+                                f"--{option.replace('_', '-')} {stored.get(option)!r} (now {options[option]!r})"
+                                for option in options if stored.get(option) != options[option])
+        raise SystemExit(f"ERROR: the cached artifact for stage `{stage}` ({path}) was produced with {differences}, run it again")
+    return artifact['results']
+
+
+def load_campaigns(args):
+    # the campaigns in the --campaigns file (a JSON list of objects with the campaign fields), or py2removal alone
+    if args.campaigns:
+        with open(args.campaigns) as f:
+            configs = json.load(f)
+    else:
+        configs = [{**PY2REMOVAL, 'destdir': args.destdir, 'history_db': args.history_db}]
+    campaigns = []
+    for config in configs:
+        missing = set(campaign._fields) - set(CAMPAIGN_DEFAULTS) - set(config)
+        unknown = set(config) - set(campaign._fields)
+        if missing or unknown:
+            raise SystemExit(f"ERROR: campaign `{config.get('name')}`: missing fields {sorted(missing)}, unknown fields {sorted(unknown)}")
+        c = campaign(**{**CAMPAIGN_DEFAULTS, **config})
+        if ':' in c.name:
+            raise SystemExit(f"ERROR: campaign `{c.name}`: the name can't contain `:`, it separates the campaign from the stage names")
+        if not callable(getattr(common, c.predicate, None)):
+            raise SystemExit(f"ERROR: campaign `{c.name}`: no dependency predicate `{c.predicate}` in common.py")
+        if c.history_db is None:
+            c = c._replace(history_db=os.path.join(c.destdir, f"{c.name}_history.sqlite"))
+        campaigns.append(c)
+    names = [c.name for c in campaigns]
+    if len(set(names)) != len(names):
+        raise SystemExit(f"ERROR: duplicate campaign names in {args.campaigns}")
+    # the pages, images and changes.json of a campaign have fixed names in its destdir
+    destdirs = [os.path.realpath(c.destdir) for c in campaigns]
+    if len(set(destdirs)) != len(destdirs):
+        raise SystemExit(f"ERROR: the campaigns in {args.campaigns} must have different destdirs")
+    return campaigns
+
+
+def campaign_ctx(ctx, campaign):
+    # the stages of a campaign see its bugs data as if it was the only one
+    return {**ctx, **ctx['campaigns_bugs'][campaign.name]}
+
+
+def expand_stage_names(names, stages):
+    # a stage of the campaigns can be given without the campaign name, to select it for all of them
+    expanded = []
+    for name in names:
+        matches = [st.name for st in stages if name in (st.name, st.name.split(':', 1)[-1])]
+        if not matches:
+            raise SystemExit(f"ERROR: unknown stage `{name}`, choose from: {', '.join(st.name for st in stages)}")
+        expanded.extend(matches)
+    return expanded
 
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--destdir', default=None, help='directory where to store the images')
-    parser.add_argument('-l', '--limit', default=None, type=int, help='limit the lists of bugs (py2removal and WNPP) retrieved (for DEBUG)')
-    parser.add_argument('-b', '--bugs', default=None, nargs='+', type=int, help='only work on the specified bugs, useful for debug')
-    parser.add_argument('--no-blocks', default=False, action="store_true", help='dont sent blocks updates to control@ (for DEBUG)')
-    parser.add_argument('--no-images', default=False, action="store_true", help='dont generate images (for DEBUG)')
-    parser.add_argument('--no-pypi', default=False, action="store_true", help='dont look for modules on PyPI (for DEBUG)')
-    args = parser.parse_args()
 
-    if not os.path.isdir(args.destdir):
-        os.makedirs(args.destdir)
+def stages_from(name, stages):
+    # the stage and all the ones after it; for a stage of the campaigns, only the following stages of the same
+    # campaign, or of each campaign when given without the campaign name
+    names = [st.name for st in stages]
+    if name in names and ':' not in name:
+        return names[names.index(name):]
+    selected = []
+    for campaign_name in dict.fromkeys(n.rpartition(':')[0] for n in names if ':' in n):
+        campaign_stages = [n for n in names if n.rpartition(':')[0] == campaign_name]
+        for n in campaign_stages:
+            if name in (n, n.rpartition(':')[2]):
+                selected.extend(campaign_stages[campaign_stages.index(n):])
+    if not selected:
+        raise SystemExit(f"ERROR: unknown stage `{name}`, choose from: {', '.join(names)}")
+    return selected
 
+
+def run_stages(args, stages):
+    # run the selected stages as soon as all the stages they require are completed, the network-bound
+    # ones on threads and the CPU-bound ones on processes; the results of the required stages which
+    # were not selected are loaded from the artifacts saved by a previous run
+    names = [st.name for st in stages]
+    by_name = {st.name: st for st in stages}
+    if args.only_stage:
+        selected = set(expand_stage_names(args.only_stage, stages))
+    elif args.from_stage:
+        selected = set(stages_from(args.from_stage, stages))
+    else:
+        selected = set(names)
+    selected.update(st.name for st in stages if not st.checkpoint and any(st.name in other.requires for other in stages if other.name in selected))
+
+    if not os.path.isdir(args.cache_dir):
+        os.makedirs(args.cache_dir)
+
+    results = {}
+    for st in stages:
+        if st.name not in selected and any(st.name in other.requires for other in stages if other.name in selected):
+            log(f"Loading stage `{st.name}` results from {artifact_path(args.cache_dir, st.name)}...")
+            results[st.name] = load_artifact(args, st.name)
+
+    pending = [st for st in stages if st.name in selected]
+    started = {}
+    timings = {}
+    # the pools callbacks run in a separate thread, use a queue to get the completed stages back
+    finished = queue.Queue()
+
+    def is_ready(st):
+        return all(req in results for req in st.requires) and all(dep in results or dep not in selected for dep in st.after)
+
+    def start(st, pool=None):
+        pending.remove(st)
+        inputs = {}
+        for req in st.requires:
+            inputs.update(results[req])
+        log(f"Starting stage `{st.name}` (on a {st.kind})...")
+        started[st.name] = time.monotonic()
+        if pool is None:
+            try:
+                finished.put((st.name, st.func(args, inputs), None, time.monotonic()))
+            except Exception as exc:
+                finished.put((st.name, None, exc, time.monotonic()))
+        else:
+            pool.apply_async(st.func, (args, inputs),
+                             callback=lambda res, name=st.name: finished.put((name, res, None, time.monotonic())),
+                             error_callback=lambda exc, name=st.name: finished.put((name, None, exc, time.monotonic())))
+
+    def complete():
+        name, res, exc, end = finished.get()
+        timings[name] = end - started.pop(name)
+        if exc is not None:
+            log(f"Stage `{name}` failed after {timings[name]:.1f}s: {exc}")
+            raise exc
+        log(f"Stage `{name}` completed in {timings[name]:.1f}s")
+        if by_name[name].checkpoint:
+            save_artifact(args, name, res)
+        results[name] = res
+
+    # the 'main' stages ready from the start (loading the binary packages) run before starting any thread
+    # or process, instead of waiting for all the other stages of the first batch to complete
+    for st in [st for st in pending if st.kind == 'main' and is_ready(st)]:
+        start(st)
+        complete()
+
+    nprocesses = len([st for st in pending if st.kind == 'process']) or 1
+    nthreads = len([st for st in pending if st.kind == 'thread']) or 1
+    # the processes are forked before starting any thread
+    with mp.get_context('fork').Pool(nprocesses) as processes, ThreadPool(nthreads) as threads:
+        while pending or started:
+            ready = [st for st in pending if is_ready(st)]
+            # a fork copies the locks held by the other threads (stdout, ssl, urllib3) but not the threads
+            # releasing them, and the children using them would hang: the 'main' stages, forking their own
+            # processes, only start when no other stage is running (the idle pools threads hold no locks);
+            # as they block this loop, the other stages ready are started first, not to wait for them
+            others = [st for st in ready if st.kind != 'main']
+            if not others and ready and not started:
+                start(ready[0])
+            for st in others:
+                start(st, processes if st.kind == 'process' else threads)
+            complete()
+
+    log('Stages wall-clock time:')
+    width = max(map(len, timings), default=0)
+    for name in names:
+        if name in timings:
+            log(f"  {name:<{width}} {timings[name]:8.1f}s")
+
+    return results
+
+
+def build_source_graph(data, sources_by_bug, bin_to_src):
+    # condense the binary-level rdeps graphs (level 1) into a source-level one, computed only once:
+    # {source with a py2removal bug: set of sources (build-)depending on any of its binaries}
+    src_graph = defaultdict(set)
+    for dta in data:
+        if dta.edges_1 == 0:
+            continue
+        rdep_srcs = src_graph[sources_by_bug[dta.bugno]]
+        for edgesrc, _, label in dta.graph_1.edges:
+            if label.lower().startswith(('build', 'testsuite')):
+                rdep_srcs.add(edgesrc)
+            else:
+                rdep_srcs.add(bin_to_src[edgesrc])
+    return src_graph
+
+
+def compute_blocks(data, src_graph, sources_by_bug, bugs_by_source, bugs_done, bugs_blockedby):
+    # for every bug, the open py2removal bugs blocking it which are not already known to the BTS
+    all_bugs_blocks = {}
+    for bugno in dict.fromkeys(dta.bugno for dta in data):
+        blockers = set(bugs_by_source[src] for src in src_graph.get(sources_by_bug[bugno], ()) if src in bugs_by_source)
+        all_bugs_blocks[bugno] = blockers - bugs_done - set(bugs_blockedby.get(bugno, [])) - set([bugno, ])
+    return all_bugs_blocks
+
+
+def remove_block_cycles(all_bugs_blocks, bugs_blockedby, bugs_done):
+    # the BTS refuses a `block` command that would create a loop, so look for cycles in the combined
+    # (current + new) blocking graph, report them and dont send the new blocks within a cycle
+    blocking_graph = defaultdict(set)
+    for bug, blockers in bugs_blockedby.items():
+        if bug not in bugs_done:
+            blocking_graph[bug].update(set(blockers) - bugs_done)
+    for bug, blockers in all_bugs_blocks.items():
+        blocking_graph[bug].update(blockers)
+    cycles = [scc for scc in common.strongly_connected_components(blocking_graph) if len(scc) > 1]
+    for cycle in cycles:
+        log(f"Blocking cycle found, not sending the new blocks between: {' '.join(map(str, sorted(cycle)))}")
+        members = set(cycle)
+        for bug in members:
+            if bug in all_bugs_blocks:
+                all_bugs_blocks[bug] -= members
+    return cycles
+
+
+def stage_fetch_wnpp(args, ctx):
     log('Retrieving WNPP bugs information...')
     if args.bugs:
         wnpp_bugs_ids = args.bugs
@@ -69,6 +385,10 @@ if __name__ == '__main__':
         else:
             log(f"Badly formatted WNPP bug: retitle {wnpp_bug.bug_num} \"{wnpp_bug.subject}\"")
 
+    return {'wnpp': wnpp}
+
+
+def stage_fetch_ftpdo(args, ctx):
     log('Retrieving ftp.debian.org bugs information...')
     if args.bugs:
         ftpdo_bugs_ids = args.bugs
@@ -90,56 +410,414 @@ if __name__ == '__main__':
             else:
                 log(f"Badly formatted ftp.debian.org bug: retitle {ftpdo_bug.bug_num} \"{ftpdo_bug.subject}\"")
 
-    log('Getting bugs tagged `py2removal`/`py2keep`...')
-    if args.bugs:
-        bugs_by_tag = args.bugs
-        py2keep_bugs_by_tag = []
+    return {'ftpdo': ftpdo}
+
+
+def stage_fetch_bugs(args, ctx, campaigns):
+    # a single query per BTS user for the usertags of all the campaigns, and a single status download
+    # for all their bugs, then split by campaign
+    tags_by_user = defaultdict(set)
+    for c in campaigns:
+        tags_by_user[c.user].update(tag for tag in (c.usertag, c.keep_usertag) if tag)
+    usertags = {}
+    if not args.bugs:
+        for user, tags in tags_by_user.items():
+            log(f"Getting bugs tagged {'/'.join(f'`{tag}`' for tag in sorted(tags))} by {user}...")
+            usertags[user] = debianbts.get_usertag(user, *sorted(tags))
+
+    bugnos_by_campaign = {}
+    for c in campaigns:
+        if args.bugs:
+            bugs_by_tag = args.bugs
+            keep_bugs_by_tag = []
+        else:
+            bugs_by_tag = usertags[c.user].get(c.usertag, [])
+            keep_bugs_by_tag = usertags[c.user].get(c.keep_usertag, []) if c.keep_usertag else []
+        if args.limit:
+            bugs_by_tag = bugs_by_tag[:args.limit]
+            keep_bugs_by_tag = keep_bugs_by_tag[:args.limit]
+        log(f"Found {len(bugs_by_tag)} `{c.usertag}` bugs" + (f" and {len(keep_bugs_by_tag)} `{c.keep_usertag}` bugs" if c.keep_usertag else ''))
+        bugnos_by_campaign[c.name] = (bugs_by_tag, keep_bugs_by_tag)
+
+    all_bugnos = set()
+    for bugs_by_tag, keep_bugs_by_tag in bugnos_by_campaign.values():
+        all_bugnos.update(bugs_by_tag, keep_bugs_by_tag)
+    log(f"Getting status of {len(all_bugnos)} bugs...")
+    statuses = {bug.bug_num: bug for bug in debianbts.get_status(sorted(all_bugnos))} if all_bugnos else {}
+
+    campaigns_bugs = {}
+    for c in campaigns:
+        bugs_by_tag, keep_bugs_by_tag = bugnos_by_campaign[c.name]
+        bugs = [statuses[bugno] for bugno in bugs_by_tag if bugno in statuses]
+        for keep_bug in (statuses[bugno] for bugno in keep_bugs_by_tag if bugno in statuses):
+            if not keep_bug.done:
+                log(f'{keep_bug.bug_num} "{keep_bug.subject}"')
+
+        # get the tags, so we can show them on the table
+        bugs_tags = {}
+        bugs_blockedby = {}
+        bugs_by_source = {}
+        sources_by_bug = {}
+        bugs_by_bugno = {}
+        bugs_done = set()
+        for bug in bugs:
+            bugs_tags[bug.bug_num] = bug.tags
+            bugs_blockedby[bug.bug_num] = bug.blockedby
+            bugs_by_source[bug.source] = bug.bug_num
+            bugs_by_bugno[bug.bug_num] = bug
+            sources_by_bug[bug.bug_num] = bug.source
+            if bug.done:
+                bugs_done.add(bug.bug_num)
+
+        campaigns_bugs[c.name] = {'bugs': bugs, 'keep_bugs_by_tag': keep_bugs_by_tag,
+                                  'bugs_tags': bugs_tags, 'bugs_blockedby': bugs_blockedby, 'bugs_by_source': bugs_by_source,
+                                  'sources_by_bug': sources_by_bug, 'bugs_by_bugno': bugs_by_bugno, 'bugs_done': bugs_done}
+
+    return {'campaigns_bugs': campaigns_bugs}
+
+
+def stage_load_unstable(args, ctx):
+    log('Processing unstable source packages data...')
+    latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, sources = common.parse_source_pkgs(lists_dir=args.lists_dir)
+
+    return {'latestbinpkgs': latestbinpkgs, 'rbdeps': rbdeps, 'rbdepsi': rbdepsi, 'rbdepsa': rbdepsa, 'rtstrig': rtstrig,
+            'sources': sources}
+
+
+def stage_load_testing(args, ctx):
+    log('Processing testing source packages data...')
+    testing_latestbinpkgs, _, _, _, _, testing_sources = common.parse_source_pkgs(distro='testing', lists_dir=args.lists_dir)
+
+    return {'testing_latestbinpkgs': testing_latestbinpkgs, 'testing_sources': testing_sources}
+
+
+def stage_load_cache(args, ctx):
+    # the binary packages data lives in the main process (in rdeps.cache), there are no results to return
+    if args.packages_suites:
+        log(f"Loading Packages indices for {', '.join(args.packages_suites)} ({', '.join(args.packages_archs)})...")
     else:
-        bugs_by_tag = debianbts.get_usertag('debian-python@lists.debian.org', 'py2removal')['py2removal']
-        py2keep_bugs_by_tag = debianbts.get_usertag('debian-python@lists.debian.org', 'py2keep')['py2keep']
-    if args.limit:
-        bugs_by_tag = bugs_by_tag[:args.limit]
-        py2keep_bugs_by_tag = py2keep_bugs_by_tag[:args.limit]
-
-    log(f"Found {len(bugs_by_tag)} `py2removal` bugs, getting status...")
-    bugs = debianbts.get_status(bugs_by_tag)
-    log(f"Found {len(py2keep_bugs_by_tag)} `py2keep` bugs, getting status...")
-    py2keep_bugs = debianbts.get_status(py2keep_bugs_by_tag)
-
-    for py2keep_bug in py2keep_bugs:
-        if not py2keep_bug.done:
-            log(f'{py2keep_bug.bug_num} "{py2keep_bug.subject}"')
-
-    # get the tags, so we can show them on the table
-    bugs_tags = {}
-    bugs_blockedby = {}
-    bugs_by_source = {}
-    sources_by_bug = {}
-    bugs_by_bugno = {}
-    bugs_done = set()
-    for bug in bugs:
-        bugs_tags[bug.bug_num] = bug.tags
-        bugs_blockedby[bug.bug_num] = bug.blockedby
-        bugs_by_source[bug.source] = bug.bug_num
-        bugs_by_bugno[bug.bug_num] = bug
-        sources_by_bug[bug.bug_num] = bug.source
-        if bug.done:
-            bugs_done.add(bug.bug_num)
+        log('Loading apt cache...')
+    rdeps.load_cache(args.packages_suites, args.packages_archs, lists_dir=args.lists_dir)
+
+    return {}
+
+
+def stage_load_archive(args, ctx):
+    # this needs the apt cache, so it runs in the main process
+    sources = ctx['sources']
+
+    # this will contain all the metapackages, like blends and all other dependency "farms" pkgs
+    metapackages = set()
+
+    nonmain = set()
+
+    # what source produces a binary
+    bin_to_src = {}
+    for source in sources:
+        for bin in sources[source].binaries:
+            # the first source listing it, as the rdeps graphs do
+            bin_to_src.setdefault(bin, source)
+            if bin in rdeps.cache:
+                if not rdeps.cache[bin].version_list:
+                    continue
+                if rdeps.cache[bin].version_list[0].section == 'metapackages' or sources[source].section == 'metapackages':
+                    metapackages.add(bin)
+                if rdeps.cache[bin].version_list[0].section.startswith(('contrib/', 'non-free/')):
+                    nonmain.add(bin)
+
+    return {'metapackages': metapackages, 'nonmain': nonmain, 'bin_to_src': bin_to_src}
+
+
+def stage_popcon(args, ctx):
+    campaigns_bugs, sources = ctx['campaigns_bugs'], ctx['sources']
+
+    # get popcon data for all the binaries of the sources with an open bug, of any campaign, in a single
+    # request, instead of once per binary while analysing the bugs
+    bins = set()
+    for bugs_data in campaigns_bugs.values():
+        for bug in bugs_data['bugs']:
+            if not bug.done and bug.source in sources:
+                bins.update(sources[bug.source].binaries)
+    log(f"Retrieving popcon data for {len(bins)} binary packages...")
+    popcons = popcon.package(*sorted(bins)) if bins else {}
+
+    return {'popcons': popcons}
+
+
+# the inputs of the analysis: set before forking the workers, which share them copy-on-write
+analysis_ctx = {}
+
+# the rdeps graphs only depend on the archive data: {(binary, level): graph record}, filled by the analysis
+# of a campaign, and shared with the analyses of the following ones
+rdeps_graphs = {}
+
+
+def rdeps_graph(bin, level):
+    if (bin, level) not in rdeps_graphs:
+        latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, sources = analysis_ctx['latestbinpkgs'], analysis_ctx['rbdeps'], analysis_ctx['rbdepsi'], analysis_ctx['rbdepsa'], analysis_ctx['rtstrig'], analysis_ctx['sources']
+        testing_latestbinpkgs, testing_sources = analysis_ctx['testing_latestbinpkgs'], analysis_ctx['testing_sources']
+        # keep the graphs as plain records, so they can be stored as stage artifacts
+        rdeps_graphs[(bin, level)] = rdeps.graph_to_record(rdeps.generate_rdeps_graph(bin, latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, level, testing_sources=testing_sources, testing_binaries=testing_latestbinpkgs, unstable_sources=sources, bin_to_src=analysis_ctx['bin_to_src']))
+    return rdeps_graphs[(bin, level)]
+
+
+def analyse_bug(bug):
+    # all the data items for a bug of the campaign; it can run in a worker process, so it returns plain records
+    bugs_by_bugno, bugs_done, wnpp = analysis_ctx['bugs_by_bugno'], analysis_ctx['bugs_done'], analysis_ctx['wnpp']
+    latestbinpkgs, sources = analysis_ctx['latestbinpkgs'], analysis_ctx['sources']
+    testing_latestbinpkgs, testing_sources = analysis_ctx['testing_latestbinpkgs'], analysis_ctx['testing_sources']
+    metapackages, nonmain, popcons = analysis_ctx['metapackages'], analysis_ctx['nonmain'], analysis_ctx['popcons']
+    campaign = analysis_ctx['campaign']
+    is_campaign_dep = getattr(common, campaign.predicate)
+
+    items = []
+    active = False  # is this bug still active, ie a src pkg with still bin pkgs depending on the campaign packages?
+    # first check the source pkg
+    source = sources[bug.source]
+    bdeps = source.build_depends + source.build_depends_indep + source.build_depends_arch + source.testsuite_triggers
+    # these are not really reverse build depends, these are the packages the src pkg b-deps on
+    brdeps = 0
+    for bdep in bdeps:
+        if is_campaign_dep(bdep):
+            brdeps += 1
+    if brdeps > 0:
+        items.append(dataitem(bug.bug_num, 'src:'+bug.source, 0, None, regex.sub(' \<[^<>]+\>', '', source.maintainer), regex.sub(' \<[^<>]+\>', '', source.uploaders), brdeps, None, wnpp.get(bug.source, None), None, None, None, real_rdeps=0, blocked_bugs=[bug for bug in bugs_by_bugno[bug.bug_num].blocks if bug not in bugs_done], in_testing='yes' if bug.source in testing_sources else 'no'))
+        active = True
+    bins = source.binaries
+    for bin in bins:
+        try:
+            if bin not in rdeps.cache:
+                continue
+            pkg = rdeps.cache[bin]
+            deps = []
+            # some packages are purely virtual, ie not available on my arch (amd64); skip them
+            if not pkg.version_list:
+                continue
+            for d in ['Depends', 'Recommends']:#, 'Suggests']:
+                deps.extend(pkg.version_list[0].depends_list.get(d, []))
+            # does the package depends on packages of the campaign?
+            if any([is_campaign_dep(y.target_pkg.name) for x in deps for y in x]):
+                active = True
+                graph_1 = rdeps_graph(bin, 1)
+                graph_N = rdeps_graph(bin, campaign.extralevel)
+
+                # very brutal heuristic to know if debian has a py3k package already
+                py3k_pkgs_avail = None
+                if campaign.python and bin.startswith('python-') and not bin.endswith(('-doc', 'dbg')):
+                    if bin.replace('python-', 'python3-') in latestbinpkgs:
+                        py3k_pkgs_avail = True
+                    else:
+                        py3k_pkgs_avail = False
+                # deps from packages outside of the same source, including only binaries&sources in testing, and not metapackages
+                real_rdeps = len( (set(edgesrc for edgesrc, _, _ in graph_1.edges) - set(bins) - metapackages) & (set(testing_latestbinpkgs) | set(testing_sources)) - nonmain )
+                items.append(dataitem(bug.bug_num, bin, len(set((edgesrc, edgedst) for edgesrc, edgedst, _ in graph_1.edges)), graph_1, regex.sub(' \<[^<>]+\>', '', source.maintainer), regex.sub(' \<[^<>]+\>', '', source.uploaders), len(deps), popcons.get(bin, None), wnpp.get(bug.source, None), len(set((edgesrc, edgedst) for edgesrc, edgedst, _ in graph_N.edges)), graph_N, py3k_pkgs_avail, real_rdeps=real_rdeps, blocked_bugs=[bug for bug in bugs_by_bugno[bug.bug_num].blocks if bug not in bugs_done], in_testing='yes' if bin in testing_latestbinpkgs else 'no'))
+        except Exception as e:
+            log(f"error processing {bin}, {e}")
+            import traceback; log(traceback.print_exc())
+            log(f"{bug.bug_num}\t{bin}")
+    if not active:
+        log(f"{bug.bug_num} (src:{bug.source}) has no `{campaign.predicate}` dependencies?")
+
+    return items
+
+
+def neighbourhood(bins, maxlevel):
+    # a cheap, names only, version of the rdeps graphs traversal: all the packages up to maxlevel,
+    # with what can change their node in the graphs (the version of their source, being in testing)
+    latestbinpkgs, sources, bin_to_src = analysis_ctx['latestbinpkgs'], analysis_ctx['sources'], analysis_ctx['bin_to_src']
+    testing_latestbinpkgs, testing_sources = analysis_ctx['testing_latestbinpkgs'], analysis_ctx['testing_sources']
+    nodes = set()
+    visited = set()
+    todo = [(bin, 1) for bin in bins]
+    while todo:
+        name, level = todo.pop()
+        nodes.add(name)
+        if name not in latestbinpkgs or name in visited or level > maxlevel:
+            continue
+        visited.add(name)
+        if name not in rdeps.cache:
+            continue
+        for rdep in rdeps.cache[name].rev_depends_list:
+            if rdep.dep_type in rdeps.RELS and rdep.parent_pkg.name in latestbinpkgs:
+                todo.append((rdep.parent_pkg.name, level+1))
+        for rb in ('rbdeps', 'rbdepsi', 'rbdepsa', 'rtstrig'):
+            nodes.update(analysis_ctx[rb].get(name, []))
+    state = []
+    for node in sorted(nodes):
+        src = bin_to_src.get(node, node)
+        state.append((node, sources[src].version if src in sources else None, node in testing_latestbinpkgs or node in testing_sources))
+    return state
+
+
+def binaries_depends(bins):
+    # the Depends/Recommends of the binaries, what decides if they are still part of the campaign: they can
+    # change without a new source version (binNMUs)
+    depends = []
+    for bin in bins:
+        if bin in rdeps.cache and rdeps.cache[bin].version_list:
+            deps = rdeps.cache[bin].version_list[0].depends_list
+            depends.append((bin, [[y.target_pkg.name for y in x] for d in ('Depends', 'Recommends') for x in deps.get(d, [])]))
+    return depends
+
+
+def bug_fingerprint(bug):
+    # changes when the BTS record, the source, the dependencies of its binaries or their neighbourhood
+    # change, ie when the data items for the bug may be different from the previous run
+    bugs_done, wnpp, sources = analysis_ctx['bugs_done'], analysis_ctx['wnpp'], analysis_ctx['sources']
+    latestbinpkgs, testing_sources = analysis_ctx['latestbinpkgs'], analysis_ctx['testing_sources']
+    source = sources[bug.source]
+    state = (analysis_ctx['campaign'].predicate, bug.log_modified, bug.severity, sorted(bug.tags), [b for b in bug.blocks if b not in bugs_done], wnpp.get(bug.source, None),
+             source.version, bug.source in testing_sources, [analysis_ctx['campaign'].python and bin.replace('python-', 'python3-') in latestbinpkgs for bin in source.binaries],
+             binaries_depends(source.binaries), neighbourhood(source.binaries, analysis_ctx['campaign'].extralevel))
+    return hashlib.sha1(repr(state).encode()).hexdigest()
+
+
+def fingerprint_and_analyse_bug(bug):
+    # without --incremental all the bugs are analysed, so their fingerprints are computed in the same pass
+    return bug_fingerprint(bug), analyse_bug(bug)
+
+
+def row_to_json(dta):
+    return {field: getattr(dta, field) for field in dataitem._fields if field not in ('graph_1', 'graph_N')}
+
+
+def compute_changes(previous_data, data):
+    # what changed in the data items since the previous run, keyed by (bug, package)
+    previous_rows = {(dta.bugno, dta.pkg): row_to_json(dta) for dta in previous_data}
+    rows = {(dta.bugno, dta.pkg): row_to_json(dta) for dta in data}
+    changes = {'added': [], 'removed': [], 'changed': []}
+    for key, row in rows.items():
+        if key not in previous_rows:
+            changes['added'].append(row)
+        elif row != previous_rows[key]:
+            changes['changed'].append({'bugno': key[0], 'pkg': key[1],
+                                       'fields': {field: [previous_rows[key][field], value] for field, value in row.items() if previous_rows[key][field] != value}})
+    for key, row in previous_rows.items():
+        if key not in rows:
+            changes['removed'].append(row)
+    return changes
+
+
+def stage_analyse(args, ctx, campaign):
+    ctx = campaign_ctx(ctx, campaign)
+    bugs, sources, popcons = ctx['bugs'], ctx['sources'], ctx['popcons']
+
+    log(f"Parsing `{campaign.usertag}` bugs...")
+
+    todo = [bug for bug in bugs if not (bug.done or bug.package == 'ftp.debian.org') and bug.source in sources]
+    analysis_ctx.clear()
+    analysis_ctx.update(ctx)
+    analysis_ctx['campaign'] = campaign
+
+    # in incremental mode, only reanalyse the bugs which changed since the previous run, reusing the other data items
+    previous = previous_artifact(args, f"{campaign.name}:analyse")
+    previous_fingerprints = previous.get('fingerprints', {})
+    previous_items = defaultdict(list)
+    for dta in previous.get('data', []):
+        previous_items[dta.bugno].append(dta)
+
+    # the archive data and rdeps.cache are already loaded: the forked workers share them (so the pool must
+    # fork, whatever the default start method), and only the bugs, their fingerprints and the resulting data
+    # items are passed around; map() keeps the order, so data is the same as a serial run
+    pool = mp.get_context('fork').Pool(args.jobs) if args.jobs > 1 else None
+
+    def pool_map(func, bugs):
+        if pool is None:
+            return [func(bug) for bug in bugs]
+        return pool.map(func, bugs, chunksize=1)
+
+    try:
+        if args.incremental:
+            log(f"Computing the fingerprints of {len(todo)} bugs...")
+            fingerprints = dict(zip((bug.bug_num for bug in todo), pool_map(bug_fingerprint, todo)))
+            changed = [bug for bug in todo if fingerprints[bug.bug_num] != previous_fingerprints.get(bug.bug_num)]
+            log(f"Analysing {len(changed)} bugs (out of {len(todo)})...")
+            results = pool_map(analyse_bug, changed)
+        else:
+            changed = todo
+            log(f"Analysing {len(changed)} bugs...")
+            fingerprints_results = pool_map(fingerprint_and_analyse_bug, changed)
+            fingerprints = {bug.bug_num: fingerprint for bug, (fingerprint, _) in zip(changed, fingerprints_results)}
+            results = [items for _, items in fingerprints_results]
+    finally:
+        if pool is not None:
+            pool.terminate()
+    analysed = {bug.bug_num: items for bug, items in zip(changed, results)}
+    # the graphs built by the workers, for the campaigns analysed next
+    for items in results:
+        for dta in items:
+            if dta.graph_1 is not None:
+                rdeps_graphs.setdefault((dta.pkg, 1), dta.graph_1)
+                rdeps_graphs.setdefault((dta.pkg, campaign.extralevel), dta.graph_N)
+
+    data = []
+    for bug in todo:
+        if bug.bug_num in analysed:
+            data.extend(analysed[bug.bug_num])
+        else:
+            # popcon data changes every day, but it's not worth a new analysis
+            data.extend(dta if dta.pkg.startswith('src:') else dta._replace(popcon=popcons.get(dta.pkg, None)) for dta in previous_items[bug.bug_num])
+
+    # a machine-readable changelog of this run, and the bugs whose images to generate again
+    changes = compute_changes(previous.get('data', []), data)
+    delta = set(analysed) | set(row['bugno'] for row in changes['added'] + changes['removed'])
+    delta.update(row['bugno'] for row in changes['changed'] if set(row['fields']) != {'popcon'})
+    changelog = {'generated': str(datetime.datetime.now(tz=datetime.timezone.utc)), 'incremental': args.incremental,
+                 'analysed': sorted(analysed), 'reused': len(todo) - len(analysed), **changes}
+    with open(os.path.join(campaign.destdir, 'changes.json'), 'w') as f:
+        json.dump(changelog, f, indent=2, default=str)
+    log(f"Data changes: {len(changes['added'])} added, {len(changes['removed'])} removed, {len(changes['changed'])} changed")
+
+    return {'data': data, 'fingerprints': fingerprints, 'delta': delta}
+
+
+def record_snapshot(db, bugs, since=None):
+    # append the counts of this run to the history, and keep track of who closed each bug (also once they are archived)
+    taken = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None).isoformat(timespec='seconds')
+    open_bugs = [bug for bug in bugs if not bug.done]
+    pendings = len([bug.bug_num for bug in open_bugs if 'pending' in bug.tags])
+    with db:
+        if db.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0] == 0:
+            # empty history: rebuild it from the closing dates of the bugs, the best we can do
+            d = defaultdict(int)
+            for bug in bugs:
+                # only the bugs closed since the start of the campaign, if known
+                if bug.done and (since is None or bug.log_modified.date() >= since):
+                    d[bug.log_modified.date()] += 1
+            # the bugs open today, plus the ones closed since, so the rebuilt history ends where this snapshot starts
+            total = len(open_bugs) + sum(d.values())
+            backfill = []
+            for kdate in sorted(d):
+                total = total - d[kdate]  # we remove the amount of bugs closed that day from the total
+                backfill.append((kdate.isoformat(), total, len(bugs) - total))
+            db.executemany('INSERT INTO snapshots (taken, open, done, backfilled) VALUES (?, ?, ?, 1)', backfill)
+        db.execute('INSERT OR REPLACE INTO snapshots (taken, open, done, pending) VALUES (?, ?, ?, ?)', (taken, len(open_bugs), len(bugs) - len(open_bugs), pendings))
+        db.execute('DELETE FROM snapshot_severities WHERE taken = ?', (taken, ))
+        db.executemany('INSERT INTO snapshot_severities (taken, severity, count) VALUES (?, ?, ?)', [(taken, severity, count) for severity, count in Counter(bug.severity for bug in open_bugs).items()])
+        db.executemany('INSERT OR IGNORE INTO closed (bugno, done_by, closed) VALUES (?, ?, ?)', [(bug.bug_num, bug.done_by, bug.log_modified.date().isoformat()) for bug in bugs if bug.done])
+        # reopened bugs
+        db.executemany('DELETE FROM closed WHERE bugno = ?', [(bug.bug_num, ) for bug in open_bugs])
+
+
+def stage_render_charts(args, ctx, campaign):
+    bugs = campaign_ctx(ctx, campaign)['bugs']
+
+    db = sqlite3.connect(campaign.history_db)
+    db.executescript(HISTORY_SCHEMA)
+    # debug runs only see some of the bugs, dont store them in the history
+    if not (args.bugs or args.limit):
+        log(f"Recording a snapshot in {campaign.history_db}...")
+        since = datetime.date.fromisoformat(campaign.progress_since) if campaign.progress_since else None
+        record_snapshot(db, bugs, since=since)
 
     # generate a progress graph
-    d = defaultdict(int)
-    for bug in bugs:
-        # there are very old bugs (Jan 2018) tagged `py2removal`; they are just a handful, so let's ignore them
-        if bug.done and bug.log_modified.date() >= datetime.date(2019, 7, 1):
-            d[bug.log_modified.date()] += 1
-    kdates, vbugs = [], []
-    total = len(bugs)
-    for kdate in sorted(d):
-        kdates.append(kdate)
-        total = total - d[kdate]  # we remove the amount of bugs closed that day from the total (whole bugs)
-        vbugs.append(total)
+    snapshots = db.execute('SELECT taken, open, pending FROM snapshots ORDER BY taken').fetchall()
+    kdates = [datetime.datetime.fromisoformat(taken) for taken, _, _ in snapshots]
+    vbugs = [open_bugs for _, open_bugs, _ in snapshots]
     # how many bugs are tagged 'pending'?
-    pendings = len([bug.bug_num for bug in bugs if 'pending' in bug.tags and not bug.done])
+    pendings = (snapshots[-1][2] or 0) if snapshots else 0
+    # RC bugs are only known for the snapshots actually taken, not for the rebuilt history
+    rc_snapshots = db.execute("SELECT taken, SUM(count) FROM snapshot_severities WHERE severity IN ('critical', 'grave', 'serious') GROUP BY taken ORDER BY taken").fetchall()
     plt_locator = mdates.MonthLocator()
     plt_formatter = mdates.AutoDateFormatter(plt_locator)
     fig, ax = plt.subplots()
@@ -149,20 +827,23 @@ if __name__ == '__main__':
         ax.plot(kdates, vbugs, label=f"open bugs ({vbugs[-1]})")
         # show a vertical line from the last date for the bugs tagged pending
         ax.plot([kdates[-1], kdates[-1]], [vbugs[-1], vbugs[-1]-pendings], label=f"bugs tagged 'pending' ({pendings})")
+    if len(rc_snapshots) > 1:
+        ax.plot([datetime.datetime.fromisoformat(taken) for taken, _ in rc_snapshots], [count for _, count in rc_snapshots], label=f"RC bugs ({rc_snapshots[-1][1]})")
     plt.xticks(rotation=18, ha='right')
     plt.grid()
     fig.tight_layout()
     ax.legend(loc='lower left')
-    plt.savefig(os.path.join(args.destdir, 'py2removal_progress.png'))
+    plt.savefig(os.path.join(campaign.destdir, f"{campaign.name}_progress.png"))
 
     # generate an unofficial leaderboard
-    topN = 20
-    doers = Counter([bug.done_by for bug in bugs if bug.done])
-    top_doers = doers.most_common(topN)
-    other_doers = doers.most_common()[topN:]
+    topN = campaign.leaderboard_top
+    doers = db.execute('SELECT done_by, COUNT(*) FROM closed GROUP BY done_by ORDER BY COUNT(*) DESC').fetchall()
+    db.close()
+    top_doers = doers[:topN]
+    other_doers = doers[topN:]
     fig, ax = plt.subplots()
     fig.set_size_inches(9.6, 7.2)
-    plt.title(f"Unofficial top {topN} py2removal leaderboard (as of {datetime.datetime.now(tz=datetime.timezone.utc)})")
+    plt.title(f"Unofficial top {topN} {campaign.name} leaderboard (as of {datetime.datetime.now(tz=datetime.timezone.utc)})")
     for name, v in top_doers:
         plt.bar(regex.sub(' <.*>', '', name), v)
     # group up the remaining uploaders in a single bar
@@ -170,135 +851,83 @@ if __name__ == '__main__':
     plt.xticks(rotation=25, ha='right')
     fig.tight_layout()
     ax.yaxis.grid()
-    plt.savefig(os.path.join(args.destdir, 'leaderboard.png'), )
+    plt.savefig(os.path.join(campaign.destdir, f"{campaign.name}_leaderboard.png"), )
 
-    log('Processing source packages data...')
-    latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, sources = common.parse_source_pkgs()
-    testing_latestbinpkgs, _, _, _, _, testing_sources = common.parse_source_pkgs(distro='testing')
+    return {}
 
-    # this will contain all the metapackages, like blends and all other dependency "farms" pkgs
-    metapackages = set()
 
-    nonmain = set()
-
-    # what source produces a binary
-    bin_to_src = {}
-    for source in sources:
-        for bin in sources[source][1].replace('\n', '').split(', '):
-            bin_to_src[bin] = source
-            if bin in rdeps.cache:
-                if not rdeps.cache[bin].version_list:
-                    continue
-                if rdeps.cache[bin].version_list[0].section == 'metapackages' or sources[source][8] == 'metapackages':
-                    metapackages.add(bin)
-                if rdeps.cache[bin].version_list[0].section.startswith(('contrib/', 'non-free/')):
-                    nonmain.add(bin)
-
-    log('Parsing bugs...')
-
-    data = []
-    for bug in bugs:
-        if bug.done or bug.package == 'ftp.debian.org':
-            continue
-        if bug.source not in sources:
-            continue
-        active = False  # is this bug still active, ie a src pkg with still bin pkgs depending on py2?
-        # first check the source pkg
-        bdeps = []
-        # these are not really reverse build depends, these are the packages the src pkg b-deps on
-        brdeps = 0
-        for d in [2, 3, 4, 5]:
-            bdeps.extend(sources[bug.source][d].replace('\n', '').split(', '))
-        for bdep in bdeps:
-            bdep = bdep.split(' ')[0]
-            if common.is_python2_dep(bdep):
-                brdeps += 1
-        if brdeps > 0:
-            data.append(dataitem(bug.bug_num, 'src:'+bug.source, 0, None, regex.sub(' \<[^<>]+\>', '', sources[bug.source][6]), regex.sub(' \<[^<>]+\>', '', sources[bug.source][7]), brdeps, None, wnpp.get(bug.source, None), None, None, None, real_rdeps=0, blocked_bugs=[bug for bug in bugs_by_bugno[bug.bug_num].blocks if bug not in bugs_done], in_testing='yes' if bug.source in testing_sources else 'no'))
-            active = True
-        bins = sources[bug.source][1].replace('\n', '').split(', ')
-        for bin in bins:
-            try:
-                if bin not in rdeps.cache:
-                    continue
-                pkg = rdeps.cache[bin]
-                deps = []
-                # some packages are purely virtual, ie not available on my arch (amd64); skip them
-                if not pkg.version_list:
-                    continue
-                for d in ['Depends', 'Recommends']:#, 'Suggests']:
-                    deps.extend(pkg.version_list[0].depends_list.get(d, []))
-                # does the package depends on python2 packages?
-                if any([common.is_python2_dep(y.target_pkg.name) for x in deps for y in x]):
-                    active = True
-                    graph_1 = rdeps.generate_rdeps_graph(bin, latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, 1, testing_sources=testing_sources, testing_binaries=testing_latestbinpkgs, unstable_sources=sources)
-                    graph_N = rdeps.generate_rdeps_graph(bin, latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, EXTRALEVEL, testing_sources=testing_sources, testing_binaries=testing_latestbinpkgs, unstable_sources=sources)
-
-                    # very brutal heuristic to know if debian has a py3k package already
-                    py3k_pkgs_avail = None
-                    if bin.startswith('python-') and not bin.endswith(('-doc', 'dbg')):
-                        if bin.replace('python-', 'python3-') in latestbinpkgs:
-                            py3k_pkgs_avail = True
-                        else:
-                            py3k_pkgs_avail = False
-                    # deps from packages outside of the same source, including only binaries&sources in testing, and not metapackages
-                    real_rdeps = len( (set(edge.get_source().replace('"', '') for edge in graph_1.get_edges()) - set(bins) - metapackages) & (set(testing_latestbinpkgs) | set(testing_sources)) - nonmain )
-                    data.append(dataitem(bug.bug_num, bin, len(set(graph_1.get_edges())), graph_1, regex.sub(' \<[^<>]+\>', '', sources[bug.source][6]), regex.sub(' \<[^<>]+\>', '', sources[bug.source][7]), len(deps), popcon.package(bin).get(bin, None), wnpp.get(bug.source, None), len(set(graph_N.get_edges())), graph_N, py3k_pkgs_avail, real_rdeps=real_rdeps, blocked_bugs=[bug for bug in bugs_by_bugno[bug.bug_num].blocks if bug not in bugs_done], in_testing='yes' if bin in testing_latestbinpkgs else 'no'))
-            except Exception as e:
-                log(f"error processing {bin}, {e}")
-                import traceback; log(traceback.print_exc())
-                log(f"{bug.bug_num}\t{bin}")
-        if not active:
-            log(f"{bug.bug_num} (src:{bug.source}) has no py2 dependencies?")
+def stage_render_images(args, ctx, campaign):
+    data, delta = ctx['data'], ctx['delta']
 
+    packages = list()
     if not args.no_images:
         log('Pre-processing graph for image generation...')
 
         # get a list of packages for which we have a graph, so we dont generated 404 URLs
-        packages = list()
         for dta in data:
-            if dta.graph_1 and len(dta.graph_1.get_edges()):
+            if dta.graph_1 and len(dta.graph_1.edges):
                 packages.append(dta.pkg)
+        # the images of the bugs not in the delta are still valid, unless their links changed
+        rerender_all = previous_artifact(args, f"{campaign.name}:render-images").get('linked_packages') != packages
 
         work = []
-        # produce text xdot for the graphs, easier to pass to mp (Dot objs are note pickleble)
+        # produce the graphs to render
         for dta in data:
-            if not dta.graph_1 or dta.pkg == 'python':
+            if not dta.graph_1 or dta.pkg in campaign.no_graphs:
                 continue
-            edges_1 = dta.graph_1.get_edges()
-            if len(edges_1) > 0 and args.destdir:
+            if len(dta.graph_1.edges) > 0:
+                outfiles = [os.path.join(campaign.destdir, f"{dta.pkg}_1.svg"), os.path.join(campaign.destdir, f"{dta.pkg}_{campaign.extralevel}.svg")]
+                if not rerender_all and dta.bugno not in delta and all(os.path.isfile(outfile) for outfile in outfiles):
+                    continue
+                graph_1 = rdeps.record_to_graph(dta.graph_1)
+                graph_N = rdeps.record_to_graph(dta.graph_N)
                 # level 1 image
-                for node_1 in dta.graph_1.get_nodes():
+                for node_1 in graph_1.get_nodes():
                     node_name = node_1.get_name().replace('"', '')
                     # create a link only if linking to a package part of the resultset
                     if node_name in packages:
                         node_1.set_URL(node_name+'_1.svg')
-                work.append((dta.graph_1, os.path.join(args.destdir, f"{dta.pkg}_1.svg")))
+                work.append((graph_1, outfiles[0]))
                 # level EXTRA image
-                for node_N in dta.graph_N.get_nodes():
+                for node_N in graph_N.get_nodes():
                     node_name = node_N.get_name().replace('"', '')
                     # create a link only if linking to a package part of the resultset
                     if node_name in packages:
-                        node_N.set_URL(node_name+f'_{EXTRALEVEL}.svg')
-                work.append((dta.graph_N, os.path.join(args.destdir, f"{dta.pkg}_{EXTRALEVEL}.svg")))
+                        node_N.set_URL(node_name+f'_{campaign.extralevel}.svg')
+                work.append((graph_N, outfiles[1]))
 
         def write_svg_graph(graph, outfile):
             graph.set_rankdir('RL')
             with open(outfile, 'wb') as f:
                 f.write(graph.create(format='svg'))
 
-        log('Generating images...')
-        with mp.Pool(mp.cpu_count()-2) as p:
+        # the SVGs are generated by dot subprocesses, threads are enough to run them in parallel
+        log(f"Generating {len(work)} images...")
+        with ThreadPool(max(mp.cpu_count()-2, 1)) as p:
             p.starmap(write_svg_graph, work)
 
-    pypi = {}
-    if not args.no_pypi:
+    return {'linked_packages': packages}
+
+
+def stage_pypi_index(args, ctx):
+    pypi_pkgs = set()
+    if not args.no_pypi and any(c.python for c in args.campaign_list):
         log('Gathering PyPI data...')
         # list of modules on PyPI
         pypi_pkgs_page = requests.get("https://pypi.org/simple/")
         tree = lxml.html.fromstring(pypi_pkgs_page.content)
         pypi_pkgs = set([package.lower() for package in tree.xpath('//a/text()')])
-        log(f'Found {len(pypi_pkgs)} PyPI packages, checking...')
+        log(f'Found {len(pypi_pkgs)} PyPI packages')
+
+    return {'pypi_pkgs': pypi_pkgs}
+
+
+def stage_pypi(args, ctx, campaign):
+    data, pypi_pkgs = ctx['data'], ctx['pypi_pkgs']
+
+    pypi = {}
+    if not args.no_pypi and campaign.python:
+        log('Checking PyPI packages...')
         for dta in data:
             # trying to figure out a matching name debian <-> PyPI...
             pkg2find = None
@@ -319,16 +948,26 @@ if __name__ == '__main__':
                 except:
                     pass  # ignore errors here
 
+    return {'pypi': pypi}
+
+
+def stage_html(args, ctx, campaign):
+    ctx = campaign_ctx(ctx, campaign)
+    bugs, bugs_by_bugno, bugs_tags, ftpdo = ctx['bugs'], ctx['bugs_by_bugno'], ctx['bugs_tags'], ctx['ftpdo']
+    data, pypi = ctx['data'], ctx['pypi']
 
     log('Generating HTML page...')
 
     # make sure we have a copy of tablefilter, https://www.tablefilter.com; it's not pretty, but it works
-    tablefilter_dir = os.path.join(args.destdir, 'TableFilter')
+    tablefilter_dir = os.path.join(campaign.destdir, 'TableFilter')
     if not os.path.isdir(tablefilter_dir):
         subprocess.call('git clone --quiet --depth 1 https://github.com/koalyptus/TableFilter %s' % tablefilter_dir, shell=True)
     else:
         subprocess.call('git -C %s pull --quiet' % tablefilter_dir, shell=True)
 
+    # the python columns (py3k?, PyPI Data) are only there for the python campaigns
+    col_types = ['string', 'string', 'string'] + (['string', 'string'] if campaign.python else []) + \
+        ['number', 'string', 'string', 'number', 'number', 'number', 'number', 'string', 'string']
     tablefilter_config = '''
 var tfConfig = {
     base_path: '%s',
@@ -344,22 +983,7 @@ var tfConfig = {
     btn_reset: {
         text: 'Clear'
     },
-    col_types: [
-        'string',
-        'string',
-        'string',
-        'string',
-        'string',
-        'number',
-        'string',
-        'string',
-        'number',
-        'number',
-        'number',
-        'number',
-        'string',
-        'string'
-    ],
+    col_types: %s,
     loader: true,
     no_results_message: true,
     sticky_headers: true,
@@ -368,7 +992,7 @@ var tfConfig = {
 };
 var tf = new TableFilter('py2rm-table', tfConfig);
 tf.init();
-    ''' % 'TableFilter/dist/tablefilter/'
+    ''' % ('TableFilter/dist/tablefilter/', json.dumps(col_types))
 
     doc, tag, text = yattag.Doc().tagtext()
     with tag('html'):
@@ -385,10 +1009,12 @@ tf.init();
             with tag('p'):
                 text(f"Total bugs found: {len(bugs)} (open: {len([x for x in bugs if not x.done])}, closed: {len([x for x in bugs if x.done])}).  ")
                 text("Progress ")
-                with tag('a', target='_blank', href='py2removal_progress.png'):
+                with tag('a', target='_blank', href=f"{campaign.name}_progress.png"):
                     text('chart')
-                text(' (only bugs closed after 2019-07-01).  Unofficial ')
-                with tag('a', target='_blank', href='leaderboard.png'):
+                if campaign.progress_since:
+                    text(f" (only bugs closed after {campaign.progress_since})")
+                text('.  Unofficial ')
+                with tag('a', target='_blank', href=f"{campaign.name}_leaderboard.png"):
                     text('leaderboard')
                 text('.')
             with tag('table', id="py2rm-table", klass="TF"):
@@ -401,11 +1027,12 @@ tf.init();
                             with tag('b'): text('Binary pkg')
                         with tag('th', _sorttype="string", style="cursor: pointer;"):
                             with tag('b'): text('in testing?')
-                        with tag('th', _sorttype="string", style="cursor: pointer;"):
-                            with tag('b'): text('py3k?')
-                        with tag('th', _sorttype="string", style="cursor: pointer;"):
-                            with tag('span', title='Latest version and PyPI classifiers Python versions'):
-                                with tag('b'): text('PyPI Data')
+                        if campaign.python:
+                            with tag('th', _sorttype="string", style="cursor: pointer;"):
+                                with tag('b'): text('py3k?')
+                            with tag('th', _sorttype="string", style="cursor: pointer;"):
+                                with tag('span', title='Latest version and PyPI classifiers Python versions'):
+                                    with tag('b'): text('PyPI Data')
                         with tag('th', _sorttype="string", style="cursor: pointer;"):
                             with tag('b'): text('Popcon')
                         with tag('th', _sorttype="string", style="cursor: pointer;"):
@@ -427,7 +1054,7 @@ tf.init();
                                 with tag('b'): text('Rdeps graph (level 1)')
                         with tag('th', _sorttype="string", style="cursor: pointer;"):
                             with tag('span', title='red node = package in testing; orange node = package from the same source; green node = package not in testing; turquoise node = metapackage; yellow-ish = package not in main'):
-                                with tag('b'): text(f"Rdeps graph (level {EXTRALEVEL})")
+                                with tag('b'): text(f"Rdeps graph (level {campaign.extralevel})")
                 for dta in sorted(data, key=lambda x: (x.real_rdeps, x.fdeps)):
                     with tag('tr'):
                         with tag('td'):
@@ -453,18 +1080,19 @@ tf.init();
                                 with tag('a', target='_blank', href=f"https://packages.debian.org/unstable/{dta.pkg}"):
                                     text(dta.pkg)
                         with tag('td'): text(dta.in_testing)
-                        with tag('td'):
-                            if dta.py3k_pkgs_avail is None:
-                                text('')
-                            elif dta.py3k_pkgs_avail:
-                                text('yes')
-                            else:
-                                text('no')
-                        with tag('td'):
-                            if dta.pkg in pypi:
-                                text(f'{pypi[dta.pkg]["version"]}: {", ".join(pypi[dta.pkg]["available_versions"])}')
-                            else:
-                                text('')
+                        if campaign.python:
+                            with tag('td'):
+                                if dta.py3k_pkgs_avail is None:
+                                    text('')
+                                elif dta.py3k_pkgs_avail:
+                                    text('yes')
+                                else:
+                                    text('no')
+                            with tag('td'):
+                                if dta.pkg in pypi:
+                                    text(f'{pypi[dta.pkg]["version"]}: {", ".join(pypi[dta.pkg]["available_versions"])}')
+                                else:
+                                    text('')
                         with tag('td'):
                             if dta.popcon:
                                 text(dta.popcon)
@@ -507,41 +1135,48 @@ tf.init();
                                 text('no graph for src pkgs (yet)')
                             else:
                                 if dta.edges_N > 0:
-                                    with tag('a', target='_blank', href=f"{dta.pkg}_{EXTRALEVEL}.svg"):
+                                    with tag('a', target='_blank', href=f"{dta.pkg}_{campaign.extralevel}.svg"):
                                         text('graph')
                                 else:
                                     text('no rdeps')
             with tag('script'):
                 text(tablefilter_config)
 
-    with open('%s/index.html' % args.destdir, 'w') as f:
+    with open('%s/index.html' % campaign.destdir, 'w') as f:
         f.write(doc.getvalue())
 
+    return {}
+
+
+def stage_control_mails(args, ctx, campaign):
+    ctx = campaign_ctx(ctx, campaign)
+    bugs_by_bugno, bugs_by_source, sources_by_bug = ctx['bugs_by_bugno'], ctx['bugs_by_source'], ctx['sources_by_bug']
+    bugs_blockedby, bugs_done, keep_bugs_by_tag = ctx['bugs_blockedby'], ctx['bugs_done'], ctx['keep_bugs_by_tag']
+    data, fingerprints, bin_to_src = ctx['data'], ctx['fingerprints'], ctx['bin_to_src']
+
+    # in incremental mode, only the bugs changed since the last run sending the commands (not since the previous
+    # analysis: if the mails were not sent, f.e. with --no-blocks or because this stage failed, they are sent again)
+    previous = previous_artifact(args, f"{campaign.name}:control-mails") if args.incremental else {}
+    sent = {}
+
+    def changed_since(key):
+        if key not in previous:
+            return set(fingerprints)
+        return set(bug for bug, fingerprint in fingerprints.items() if previous[key].get(bug) != fingerprint)
+
     # we can opt-out from sending mails to control@, useful for debug
-    if not args.no_blocks:
+    if args.no_blocks:
+        if 'blocks_fingerprints' in previous:
+            sent['blocks_fingerprints'] = previous['blocks_fingerprints']
+    else:
         log('Generating control@ email to update block information...')
-        all_bugs_blocks = defaultdict(set)
-        for dta in data:
-            current_blocks = set()
-            if dta.bugno in all_bugs_blocks:
-                current_blocks = all_bugs_blocks[dta.bugno]
-            current_blocks = current_blocks.union(set(bugs_blockedby.get(dta.bugno, [])))
-            all_blocks = set()
-            if dta.edges_1 > 0:
-                for edge in dta.graph_1.get_edges():
-                    edgesrc = edge.get_source().replace('"', '')
-                    if edge.get_label().lower().startswith(('build', 'testsuite')):
-                        src = edgesrc
-                    else:
-                        src = bin_to_src[edgesrc]
-                    if src not in bugs_by_source.keys():
-                        pass #  FIXME: log(f"ERROR: {src} found but no bug is open for that source")
-                    else:
-                        current_bug = bugs_by_source[src]
-                        if current_bug not in bugs_done:
-                            all_blocks.add(current_bug)
-            new_blocks = all_blocks - current_blocks - set([dta.bugno,])
-            all_bugs_blocks[dta.bugno] = all_bugs_blocks[dta.bugno].union(new_blocks)
+        delta = changed_since('blocks_fingerprints')
+        src_graph = build_source_graph(data, sources_by_bug, bin_to_src)
+        all_bugs_blocks = compute_blocks(data, src_graph, sources_by_bug, bugs_by_source, bugs_done, bugs_blockedby)
+        remove_block_cycles(all_bugs_blocks, bugs_blockedby, bugs_done)
+        # only for the bugs in the delta, or blocked by the bug of a source in the delta
+        delta_sources = set(sources_by_bug[bug] for bug in delta if bug in sources_by_bug)
+        all_bugs_blocks = {bug: blocks for bug, blocks in all_bugs_blocks.items() if bug in delta or src_graph.get(sources_by_bug[bug], set()) & delta_sources}
 
         blocks_mail_body = []
         for bug, blocks in all_bugs_blocks.items():
@@ -556,38 +1191,45 @@ tf.init();
 
         # send the mail to control@, only if we have something to send
         if blocks_mail_body:
-            mail_preamble = ['# This is an automated script, part of the effort for the removal of Python 2 from bullseye',
-                             '#  * https://wiki.debian.org/Python/2Removal',
-                             '#  * http://sandrotosi.me/debian/py2removal/index.html',
-                             '',
-                             ]
+            mail_preamble = campaign.blocks_preamble + ['', ]
             s = smtplib.SMTP(host='localhost', port=25)
             msg = MIMEMultipart()
             msg['From'] = 'Sandro Tosi <morph@debian.org>'
             msg['To'] = 'control@bugs.debian.org'
             msg['Cc'] = 'Sandro Tosi <morph@debian.org>'
-            msg['Subject'] = f"py2removal blocks updates - {datetime.datetime.now(tz=datetime.timezone.utc)}"
+            msg['Subject'] = f"{campaign.name} blocks updates - {datetime.datetime.now(tz=datetime.timezone.utc)}"
             msg.attach(MIMEText('\n'.join(mail_preamble + blocks_mail_body), 'plain'))
             log(msg)
             if not args.bugs:
                 s.send_message(msg)
+        sent['blocks_fingerprints'] = fingerprints
+
+    # campaigns not bumping the severity of their bugs
+    if campaign.rc_real_rdeps is None:
+        return sent
 
     log('Generating control@ email to raise severity to RC...')
     rc_severity_body = []
     rc_severity = defaultdict(list)
     rc_dont_bump = list()
+    delta = changed_since('severity_fingerprints')
     apps_rc_threshold = 1000
     for dta in data:
+        if dta.bugno not in delta:
+            continue
         try:
-            # skip this part if the bug is marked as `py2keep` or a not-module package
-            if dta.bugno not in py2keep_bugs_by_tag and not dta.pkg.endswith(('-doc', '-docs', '-common', '-examples', '-data', '-test', '-dbg')):
-                # if the current package has no real rdeps and it's no part of the do-not-raise list
-                if dta.real_rdeps == 0 and dta.bugno not in rc_dont_bump:
+            # skip this part if the bug is marked with the keep usertag or a not-module package
+            if dta.bugno not in keep_bugs_by_tag and not dta.pkg.endswith(('-doc', '-docs', '-common', '-examples', '-data', '-test', '-dbg')):
+                # if the current package has (almost) no real rdeps and it's no part of the do-not-raise list
+                if dta.real_rdeps <= campaign.rc_real_rdeps and dta.bugno not in rc_dont_bump:
                     if bugs_by_bugno[dta.bugno].severity != 'serious':
-                        if dta.pkg.startswith('python-'):
-                            rc_severity[dta.bugno].append(f'# {dta.pkg} is a module and has 0 external rdeps or not in testing')
+                        if not campaign.python:
+                            if not dta.pkg.startswith('src:'):
+                                rc_severity[dta.bugno].append(f'# {dta.pkg} has {dta.real_rdeps} external rdeps or not in testing')
+                        elif dta.pkg.startswith('python-'):
+                            rc_severity[dta.bugno].append(f'# {dta.pkg} is a module and has {dta.real_rdeps} external rdeps or not in testing')
                         elif not dta.pkg.startswith(('python-', 'src:')):
-                            rc_severity[dta.bugno].append(f'# {dta.pkg} is an application and has 0 external rdeps or not in testing')
+                            rc_severity[dta.bugno].append(f'# {dta.pkg} is an application and has {dta.real_rdeps} external rdeps or not in testing')
                 else:
                     if dta.bugno in rc_dont_bump:
                         continue
@@ -609,24 +1251,96 @@ tf.init();
         rc_severity_body.append(f'severity {rc_bug} serious')
 
     if rc_severity_body:
-        mail_preamble = ['# This is an automated script, part of the effort for the removal of Python 2 from bullseye',
-                         '#  * https://wiki.debian.org/Python/2Removal',
-                         '#  * http://sandrotosi.me/debian/py2removal/index.html',
-                         '# See https://lists.debian.org/debian-devel-announce/2019/11/msg00000.html',
-                         '# and https://lists.debian.org/debian-python/2019/12/msg00076.html',
-                         '# and https://lists.debian.org/debian-python/2020/03/msg00087.html',
-                         '# mail threads for more details on this severity update',
-                         '',
-                         ]
+        mail_preamble = campaign.severity_preamble + ['', ]
         s = smtplib.SMTP(host='localhost', port=25)
         msg = MIMEMultipart()
         msg['From'] = 'Sandro Tosi <morph@debian.org>'
         msg['To'] = 'control@bugs.debian.org'
         msg['Cc'] = 'Sandro Tosi <morph@debian.org>'
-        msg['Subject'] = f"py2removal bugs severity updates - {datetime.datetime.now(tz=datetime.timezone.utc)}"
+        msg['Subject'] = f"{campaign.name} bugs severity updates - {datetime.datetime.now(tz=datetime.timezone.utc)}"
         msg.attach(MIMEText('\n'.join(mail_preamble + rc_severity_body), 'plain'))
         log(msg)
         if not args.bugs:
             s.send_message(msg)
+    sent['severity_fingerprints'] = fingerprints
+
+    return sent
+
+
+# the stages shared by all the campaigns, and the ones run for each of them (in a valid execution order), where
+# the stages of the campaign are named `<campaign>:<stage>`
+SHARED_STAGES = [
+    stage('fetch-wnpp', stage_fetch_wnpp, [], 'thread'),
+    stage('fetch-ftpdo', stage_fetch_ftpdo, [], 'thread'),
+    stage('fetch-bugs', stage_fetch_bugs, [], 'thread'),
+    stage('pypi-index', stage_pypi_index, [], 'thread'),
+    stage('load-unstable', stage_load_unstable, [], 'process'),
+    stage('load-testing', stage_load_testing, [], 'process'),
+    stage('popcon', stage_popcon, ['fetch-bugs', 'load-unstable'], 'thread'),
+    # PackagesIndex.load() forks its own pool of processes: it runs first, before starting any thread
+    stage('load-cache', stage_load_cache, [], 'main', checkpoint=False),
+    stage('load-archive', stage_load_archive, ['load-unstable', 'load-cache'], 'thread'),
+]
+
+CAMPAIGN_STAGES = [
+    stage('render-charts', stage_render_charts, ['fetch-bugs'], 'process'),
+    stage('analyse', stage_analyse, ['fetch-wnpp', 'fetch-bugs', 'load-unstable', 'load-testing', 'load-cache', 'load-archive', 'popcon'], 'main'),
+    # it has its own pool of threads to generate the SVGs
+    stage('render-images', stage_render_images, ['analyse'], 'thread'),
+    stage('pypi', stage_pypi, ['analyse', 'pypi-index'], 'thread'),
+    stage('html', stage_html, ['fetch-ftpdo', 'fetch-bugs', 'analyse', 'pypi'], 'thread'),
+    stage('control-mails', stage_control_mails, ['fetch-bugs', 'load-archive', 'analyse'], 'thread'),
+]
+
+
+def build_stages(campaigns):
+    stages = [st._replace(func=functools.partial(st.func, campaigns=campaigns)) if st.name == 'fetch-bugs' else st
+              for st in SHARED_STAGES]
+    campaign_stage_names = [st.name for st in CAMPAIGN_STAGES]
+    previous_analyse = ()
+    for c in campaigns:
+        for st in CAMPAIGN_STAGES:
+            requires = [f"{c.name}:{req}" if req in campaign_stage_names else req for req in st.requires]
+            # the analyses run one after the other, to reuse the rdeps graphs of the previous campaigns
+            after = previous_analyse if st.name == 'analyse' else ()
+            stages.append(st._replace(name=f"{c.name}:{st.name}", func=functools.partial(st.func, campaign=c), requires=requires, after=after))
+        previous_analyse = (f"{c.name}:analyse", )
+    return stages
+
+
+if __name__ == '__main__':
+
+    stage_names = [st.name for st in SHARED_STAGES + CAMPAIGN_STAGES]
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--destdir', default=None, help='directory where to store the images (of the py2removal campaign, without --campaigns)')
+    parser.add_argument('--campaigns', default=None, help='JSON file with the list of the campaigns to track, each with its usertags, dependency predicate, thresholds and destdir, default only py2removal')
+    parser.add_argument('-l', '--limit', default=None, type=int, help='limit the lists of bugs (of the campaigns and WNPP) retrieved (for DEBUG)')
+    parser.add_argument('-b', '--bugs', default=None, nargs='+', type=int, help='only work on the specified bugs, useful for debug')
+    parser.add_argument('--no-blocks', default=False, action="store_true", help='dont sent blocks updates to control@ (for DEBUG)')
+    parser.add_argument('--no-images', default=False, action="store_true", help='dont generate images (for DEBUG)')
+    parser.add_argument('--no-pypi', default=False, action="store_true", help='dont look for modules on PyPI (for DEBUG)')
+    parser.add_argument('--lists-dir', default=common.APT_LISTS_DIR, help=f'directory with the (optionally compressed) Sources/Packages indices, apt lists or mirror layout, default {common.APT_LISTS_DIR}')
+    parser.add_argument('--packages-suites', default=None, nargs='+', help='read the binary packages from the Packages indices of these suites, instead of using the apt cache')
+    parser.add_argument('--packages-archs', default=['amd64'], nargs='+', help='architectures of the Packages indices to read, default amd64')
+    parser.add_argument('-j', '--jobs', default=mp.cpu_count(), type=int, help='number of processes analysing the bugs, default the number of CPUs')
+    parser.add_argument('--incremental', default=False, action="store_true", help='only analyse the bugs changed since the previous run, reusing the other data from --cache-dir')
+    parser.add_argument('--history-db', default=None, help='SQLite database with the history of the bugs (without --campaigns), default DESTDIR/py2removal_history.sqlite')
+    parser.add_argument('--cache-dir', default=os.path.expanduser('~/.cache/py2rm_progress'), help='directory where to store the results of each stage, default ~/.cache/py2rm_progress')
+    stage_group = parser.add_mutually_exclusive_group()
+    stage_group.add_argument('--from-stage', default=None, metavar='STAGE', help=f"resume the run from this stage (of all the campaigns, or `<campaign>:<stage>`), using the cached results of the previous ones; one of {', '.join(stage_names)}")
+    stage_group.add_argument('--only-stage', default=None, nargs='+', metavar='STAGE', help='only (re-)run these stages (of all the campaigns, or `<campaign>:<stage>`), using the cached results of the previous ones')
+    args = parser.parse_args()
+
+    if not (args.campaigns or args.destdir):
+        parser.error('--destdir is required without --campaigns')
+    campaigns = load_campaigns(args)
+    # the artifacts record the configuration of the campaigns they depend on
+    args.campaign_list = campaigns
+    for c in campaigns:
+        if not os.path.isdir(c.destdir):
+            os.makedirs(c.destdir)
+
+    run_stages(args, build_stages(campaigns))
 
     log('Script completed')
@@ -4,32 +4,76 @@ import apt_pkg
 import sys
 import pydot
 import argparse
+import json
+from collections import namedtuple
 # for visualization, check https://github.com/jrfonseca/xdot.py/blob/master/sample.py
 import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk
 import xdot
-from common import parse_source_pkgs
+from common import parse_source_pkgs, APT_LISTS_DIR
+import pkgindex
 
 
 # binary packages relationships we're interested in, so ignore Conflicts/Breaks/etc
 RELS = ['Depends', 'Recommends']#, 'Suggests', ]
 
+# plain representation of a rdeps graph: pydot objects can't be pickled, this can
+#  nodes: tuple of (name, color or None), edges: tuple of (source, destination, label)
+rdepsgraph = namedtuple('rdepsgraph', ['nodes', 'edges'])
+
+# the items found walking the reverse dependencies: nodes (with no color for the packages walked through)
+# and edges, from the reverse dependency `source` to `target` with the relationship `type`
+rdepsnode = namedtuple('rdepsnode', ['name', 'color'])
+rdepsedge = namedtuple('rdepsedge', ['source', 'target', 'type', 'level', 'color'])
+
+# what the colors of the nodes mean
+COLOR_CLASSES = {
+    'red': 'in-testing',
+    'green': 'not-in-testing',
+    'orange': 'same-source',
+    'turquoise': 'metapackage',
+    'yellow4': 'not-in-main',
+}
+
 apt_pkg.init_config()
 apt_pkg.init_system()
-cache = apt_pkg.Cache(None)
+# the binary packages data, see load_cache()
+cache = None
+
+
+def load_cache(suites=None, archs=None, lists_dir=APT_LISTS_DIR):
+    # either the apt cache of the host, or (much faster to build) an index of the Packages files of
+    # the given suites and architectures
+    global cache
+    if suites:
+        cache = pkgindex.PackagesIndex.load(suites, archs or ['amd64'], lists_dir=lists_dir)
+    else:
+        cache = apt_pkg.Cache(None)
+    return cache
 
 
-def generate_rdeps_graph(pkg_name, latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, maxlevel, testing_sources=None, testing_binaries=None, unstable_sources=None):
+def binaries_sources(unstable_sources):
+    # what source produces a binary (the first one listing it), so it's not searched for every node
+    bin_to_src = {}
+    for source, record in unstable_sources.items():
+        for bin in record.binaries:
+            bin_to_src.setdefault(bin, source)
+    return bin_to_src
+
+
+def iter_rdeps(pkg_name, latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, maxlevel, testing_sources=None, testing_binaries=None, unstable_sources=None, bin_to_src=None):
+    # walk the reverse dependencies, yielding the nodes and edges as soon as they are found
+    if bin_to_src is None:
+        bin_to_src = binaries_sources(unstable_sources)
     visited = set()
-    graph = pydot.Dot(graph_type='digraph', simplify=False, rankdir='RL')
     todo = list()
     # list, "heap", of (package-name, level) so we can skip the highest levels down the recursion
     todo.append((pkg_name, 1))
 
     while len(todo):
         name, level = todo.pop()
-        graph.add_node(pydot.Node(name))
+        yield rdepsnode(name, None)
         if name not in latestbinpkgs:
             continue
         if name in visited:
@@ -41,23 +85,23 @@ def generate_rdeps_graph(pkg_name, latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtst
             continue
         pkg = cache[name]
         rdeps = pkg.rev_depends_list
-        same_source_bins = [v[1].split(', ') for k, v in unstable_sources.items() if name in v[1].split(', ')][0]
+        same_source_bins = unstable_sources[bin_to_src[name]].binaries
         for rdep in rdeps:
             if rdep.parent_pkg.name not in latestbinpkgs:
                 continue
             if rdep.dep_type in RELS:
-                sourcepkg = [k for k, v in unstable_sources.items() if rdep.parent_pkg.name in v[1].split(', ')][0]
+                sourcepkg = bin_to_src[rdep.parent_pkg.name]
                 color = 'red'
                 if testing_binaries and rdep.parent_pkg.name not in testing_binaries:
                     color = 'green'
                 if rdep.parent_pkg.name in same_source_bins:
                     color = 'orange'
-                if rdep.parent_ver.section == 'metapackages' or unstable_sources[sourcepkg][8] == 'metapackages':
+                if rdep.parent_ver.section == 'metapackages' or unstable_sources[sourcepkg].section == 'metapackages':
                     color = 'turquoise'
                 if rdep.parent_ver.section.startswith(('contrib/', 'non-free/')):
                     color = 'yellow4'
-                graph.add_node(pydot.Node(rdep.parent_pkg.name, color=color))
-                graph.add_edge(pydot.Edge(rdep.parent_pkg.name, name, label=rdep.dep_type+f" (lvl={level})"))
+                yield rdepsnode(rdep.parent_pkg.name, color)
+                yield rdepsedge(rdep.parent_pkg.name, name, rdep.dep_type, level, color)
                 todo.append((rdep.parent_pkg.name, level+1))
         for rbdep in rbdeps[name]:
             color = 'red'
@@ -67,33 +111,62 @@ def generate_rdeps_graph(pkg_name, latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtst
                 color = 'orange'
             if rbdep in cache and cache[rbdep].version_list and cache[rbdep].version_list[0].section.startswith(('contrib/', 'non-free/')):
                 color = 'yellow4'
-            graph.add_node(pydot.Node(rbdep, color=color))
-            graph.add_edge(pydot.Edge(rbdep, name, label=f"Build-Depends (lvl={level})"))
+            yield rdepsnode(rbdep, color)
+            yield rdepsedge(rbdep, name, 'Build-Depends', level, color)
         for rbdepi in rbdepsi[name]:
             color = 'red'
             if testing_sources and rbdepi not in testing_sources:
                 color = 'green'
             if rbdepi in same_source_bins:
                 color = 'orange'
-            graph.add_node(pydot.Node(rbdepi, color=color))
-            graph.add_edge(pydot.Edge(rbdepi, name, label=f"Build-Depends-Indep (lvl={level})"))
+            yield rdepsnode(rbdepi, color)
+            yield rdepsedge(rbdepi, name, 'Build-Depends-Indep', level, color)
         for rbdepa in rbdepsa[name]:
             color = 'red'
             if testing_sources and rbdepa not in testing_sources:
                 color = 'green'
             if rbdepa in same_source_bins:
                 color = 'orange'
-            graph.add_node(pydot.Node(rbdepa, color=color))
-            graph.add_edge(pydot.Edge(rbdepa, name, label=f"Build-Depends-Arch (lvl={level})"))
+            yield rdepsnode(rbdepa, color)
+            yield rdepsedge(rbdepa, name, 'Build-Depends-Arch', level, color)
         for rtstrigg in rtstrig[name]:
             color = 'red'
             if testing_sources and rtstrigg not in testing_sources:
                 color = 'green'
             if rtstrigg in same_source_bins:
                 color = 'orange'
-            graph.add_node(pydot.Node(rtstrigg, color=color))
-            graph.add_edge(pydot.Edge(rtstrigg, name, label=f"Testsuite-Triggers (lvl={level})"))
+            yield rdepsnode(rtstrigg, color)
+            yield rdepsedge(rtstrigg, name, 'Testsuite-Triggers', level, color)
 
+
+def generate_rdeps_graph(pkg_name, latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, maxlevel, testing_sources=None, testing_binaries=None, unstable_sources=None, bin_to_src=None):
+    graph = pydot.Dot(graph_type='digraph', simplify=False, rankdir='RL')
+    for item in iter_rdeps(pkg_name, latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, maxlevel, testing_sources=testing_sources, testing_binaries=testing_binaries, unstable_sources=unstable_sources, bin_to_src=bin_to_src):
+        if isinstance(item, rdepsedge):
+            graph.add_edge(pydot.Edge(item.source, item.target, label=f"{item.type} (lvl={item.level})"))
+        elif item.color:
+            graph.add_node(pydot.Node(item.name, color=item.color))
+        else:
+            graph.add_node(pydot.Node(item.name))
+
+    return graph
+
+
+def graph_to_record(graph):
+    nodes = tuple((node.get_name().replace('"', ''), node.get('color')) for node in graph.get_nodes())
+    edges = tuple((edge.get_source().replace('"', ''), edge.get_destination().replace('"', ''), edge.get_label()) for edge in graph.get_edges())
+    return rdepsgraph(nodes, edges)
+
+
+def record_to_graph(record):
+    graph = pydot.Dot(graph_type='digraph', simplify=False, rankdir='RL')
+    for name, color in record.nodes:
+        if color:
+            graph.add_node(pydot.Node(name, color=color))
+        else:
+            graph.add_node(pydot.Node(name))
+    for source, destination, label in record.edges:
+        graph.add_edge(pydot.Edge(source, destination, label=label))
     return graph
 
 
@@ -101,20 +174,42 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--level', '-l', dest='level', default=2, type=int,
                         help='maximum level of recursion, default 2')
-    parser.add_argument('--text', '-t', dest='text', default=False, action="store_true",
-                        help='print a text representation, instead of a graph')
+    output_group = parser.add_mutually_exclusive_group()
+    output_group.add_argument('--text', '-t', dest='text', default=False, action="store_true",
+                              help='print a text representation, instead of a graph')
+    output_group.add_argument('--json', '-j', dest='json', default=False, action="store_true",
+                              help='stream the edges as NDJSON (one JSON object per line) while they are found, instead of a graph')
+    parser.add_argument('--lists-dir', dest='lists_dir', default=APT_LISTS_DIR,
+                        help=f'directory with the (optionally compressed) Sources/Packages indices, apt lists or mirror layout, default {APT_LISTS_DIR}')
+    parser.add_argument('--packages-suites', dest='packages_suites', default=None, nargs='+',
+                        help='read the binary packages from the Packages indices of these suites, instead of using the apt cache')
+    parser.add_argument('--packages-archs', dest='packages_archs', default=['amd64'], nargs='+',
+                        help='architectures of the Packages indices to read, default amd64')
     parser.add_argument('pkgs', nargs='+', help='list of packages to analize, currently only the first is accepted')
     args = parser.parse_args()
+    # only print progress information when showing the graph
+    verbose = not (args.text or args.json)
 
-    if not args.text:
+    if verbose:
         print('Parsing Sources Index...')
 
-    latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, sources = parse_source_pkgs()
-    testing_latestbinpkgs, _, _, _, _, testing_sources = parse_source_pkgs(distro='testing')
+    latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, sources = parse_source_pkgs(lists_dir=args.lists_dir)
+    testing_latestbinpkgs, _, _, _, _, testing_sources = parse_source_pkgs(distro='testing', lists_dir=args.lists_dir)
+
+    if verbose:
+        print('Loading binary packages data...')
 
-    if not args.text:
+    load_cache(args.packages_suites, args.packages_archs, lists_dir=args.lists_dir)
+
+    if verbose:
         print(f"Processing reverse dependencies (with max {args.level} depth level)...")
 
+    if args.json:
+        for item in iter_rdeps(args.pkgs[0], latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, args.level, testing_sources=testing_sources, testing_binaries=testing_latestbinpkgs, unstable_sources=sources):
+            if isinstance(item, rdepsedge):
+                print(json.dumps({**item._asdict(), 'class': COLOR_CLASSES[item.color]}), flush=True)
+        sys.exit(0)
+
     graph = generate_rdeps_graph(args.pkgs[0], latestbinpkgs, rbdeps, rbdepsi, rbdepsa, rtstrig, args.level, testing_sources=testing_sources, testing_binaries=testing_latestbinpkgs, unstable_sources=sources)
 
     #with open('image.png', 'wb') as f: